@@ -0,0 +1 @@
+# Empty for package recognition
\ No newline at end of file
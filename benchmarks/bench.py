@@ -0,0 +1,300 @@
+"""Micro and macro benchmarks for the hot paths, compared against a stored baseline.
+
+    python -m benchmarks.bench                      # small + medium, compare to baseline
+    python -m benchmarks.bench --sizes small large  # pick sizes
+    python -m benchmarks.bench --update-baseline    # record a new baseline
+
+Timings are machine-specific, so no baseline is shipped: record one on the
+machine that runs the comparison with --update-baseline first. Comparing
+without a baseline fails instead of silently recording one.
+
+Everything runs on seeded synthetic OHLCV with stubbed network and Telegram,
+so results only depend on the code and the machine.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from src.data import add_atr
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# name: (bars per pair, pairs)
+SIZES = {
+    "small": (200, 3),
+    "medium": (1000, 50),
+    "large": (10_000, 100),
+}
+TIMEFRAME = "3m"
+STEP_MS = 180_000
+# Ignore differences smaller than this - tiny workloads are mostly noise
+MIN_DELTA = {"median_s": 0.001, "peak_kb": 256}
+
+
+def make_market(n_bars, n_pairs, seed=42):
+    """Seeded random-walk OHLCV with ATR, keyed like fetch_all_data: {(symbol, tf): df}"""
+    rng = np.random.default_rng(seed)
+    start_ms = int(time.time() * 1000) // STEP_MS * STEP_MS - n_bars * STEP_MS
+    open_time = start_ms + np.arange(n_bars, dtype=np.int64) * STEP_MS
+    market = {}
+    for p in range(n_pairs):
+        base = float(rng.uniform(0.1, 50_000))
+        close = base * np.exp(np.cumsum(rng.normal(0, 0.003, n_bars)))
+        open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.0005, n_bars))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n_bars)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n_bars)))
+        df = pd.DataFrame({
+            "open_time": pd.to_datetime(open_time, unit="ms"),
+            "open": open_, "high": high, "low": low, "close": close,
+            "volume": rng.lognormal(3, 0.5, n_bars),
+            "close_time": open_time + STEP_MS - 1,
+        }).set_index("open_time")
+        df.attrs['fetched_at'] = time.time()
+        market[(f"SYN{p:04d}USDT", TIMEFRAME)] = add_atr(df)
+    return market
+
+
+def make_trades(market, n_trades, seed=7):
+    rng = np.random.default_rng(seed)
+    keys = list(market)
+    trades = []
+    for i in range(n_trades):
+        symbol, tf = keys[i % len(keys)]
+        entry = float(market[(symbol, tf)]['close'].iloc[-20])
+        side = "LONG" if rng.random() < 0.5 else "SHORT"
+        d = 1 if side == "LONG" else -1
+        trades.append({
+            'slno': f"{i % 99 + 1:02d}", 'symbol': symbol, 'timeframe': tf, 'side': side,
+            'entry': entry, 'sl': entry * (1 - d * 0.004),
+            'tp': [entry * (1 + d * m) for m in (0.002, 0.004, 0.006)],
+            'strategy': "RSI Oversold Scalp", 'atr_value': entry * 0.002,
+            'opened_at': int(time.time()) - 600, 'confidence': 0.6,
+        })
+    return trades
+
+
+# -- benchmarks ------------------------------------------------------------
+# Each factory gets the synthetic market and returns a zero-argument callable.
+
+def bench_run_all_strategies(market):
+    from src.strategies import run_all_strategies
+    return lambda: [run_all_strategies(df) for df in market.values()]
+
+
+def bench_backtest_strategies(market):
+    from src.strategies import backtest_strategies
+    return lambda: [backtest_strategies(df) for df in market.values()]
+
+
+def bench_calculate_confidence(market):
+    from src.confidence import calculate_confidence
+    signal = {'side': "LONG"}
+    return lambda: [calculate_confidence(signal, df, 0.5) for df in market.values()]
+
+
+def bench_candidate_pipeline(market):
+    from src.candidates import CandidateTable
+    from src.strategies import STRATEGY_LIST
+    from src.validation import valid_mask
+    strats = [{"strategy": s["name"], "side": s["side"], "atr_mult": s["atr_mult"]} for s in STRATEGY_LIST]
+
+    def run():
+        table = CandidateTable()
+        for (symbol, tf), df in market.items():
+            table.add_pair(symbol, tf, df, strats, [s["atr_mult"]["sl"] for s in strats],
+                           [s["atr_mult"]["tp"] for s in strats], [0.5] * len(strats))
+        table.finalize()
+        return table.top_k(valid_mask(table, 0.55), 5)
+    return run
+
+
+def bench_check_trade_exit(market):
+    from src.signal_builder import check_trade_exit
+    trades = make_trades(market, 20 * len(market))
+    return lambda: [check_trade_exit(t, market[(t['symbol'], t['timeframe'])]) for t in trades]
+
+
+def bench_cache_persistence(market):
+    from src.cache import SignalCache, TradeCache, StrategyHistory
+    trades = make_trades(market, min(len(market), 20))
+
+    def run():
+        with tempfile.TemporaryDirectory() as d:
+            signals = SignalCache(os.path.join(d, "signals.json"))
+            active = TradeCache(os.path.join(d, "trades.json"))
+            history = StrategyHistory(os.path.join(d, "history.json"))
+            for t in trades:
+                signals.add(t)
+                active.add(t)
+                history.add(t['strategy'], {"outcome": "TP1 Hit", "profit": 1.0, "timestamp": int(time.time())})
+            for t in trades:
+                active.close(t['slno'])
+    return run
+
+
+def bench_runner_main(market):
+    """Full runner.main() pass with stubbed fetch and Telegram in a scratch .cache"""
+    import runner
+    from src.market_state import MarketState
+    from src.mtf import build_views
+
+    class StubTelegram:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def test_connection(self):
+            return True
+
+        async def send_signal(self, *args, **kwargs):
+            pass
+
+        async def send_trade_close(self, *args, **kwargs):
+            pass
+
+        async def send_error(self, *args, **kwargs):
+            pass
+
+        async def _send(self, *args, **kwargs):
+            pass
+
+    def stub_fetch(symbols, timeframes, *args, pairs=None, **kwargs):
+        # Only the pairs the scheduler planned; the stub returns at once, so no deadline can pass
+        wanted = set(pairs) if pairs is not None else {(s, tf) for s in symbols for tf in timeframes}
+        return {key: df for key, df in market.items() if key in wanted}
+
+    def run():
+        cwd = os.getcwd()
+        saved = (runner.TelegramBot, runner.fetch_all_data, runner.fetch_exit_windows, runner.build_views,
+                 runner.SYMBOLS, runner.TIMEFRAMES, runner.MARKET)
+        with tempfile.TemporaryDirectory() as d:
+            os.chdir(d)
+            os.makedirs(".cache")
+            runner.TelegramBot = StubTelegram
+            runner.fetch_all_data = stub_fetch
+            runner.fetch_exit_windows = lambda trades, *a, **k: {}  # Exits fall back to the market candles
+            runner.build_views = lambda symbols, timeframes, data, cache=None, **kwargs: build_views(
+                symbols, timeframes, data, cache, fetch_missing=False)
+            runner.SYMBOLS = sorted({symbol for symbol, _ in market})
+            runner.TIMEFRAMES = [TIMEFRAME]
+            # A fresh ring per run: the rings ignore candles at or before their last
+            # one, so a reused MARKET would keep an earlier run's (or size's) bars
+            runner.MARKET = MarketState(capacity=runner.CANDLE_WINDOW)
+            try:
+                asyncio.run(runner.main())
+            finally:
+                os.chdir(cwd)
+                (runner.TelegramBot, runner.fetch_all_data, runner.fetch_exit_windows, runner.build_views,
+                 runner.SYMBOLS, runner.TIMEFRAMES, runner.MARKET) = saved
+    return run
+
+
+BENCHMARKS = {
+    "run_all_strategies": bench_run_all_strategies,
+    "backtest_strategies": bench_backtest_strategies,
+    "calculate_confidence": bench_calculate_confidence,
+    "candidate_pipeline": bench_candidate_pipeline,
+    "check_trade_exit": bench_check_trade_exit,
+    "cache_persistence": bench_cache_persistence,
+    "runner_main": bench_runner_main,
+}
+
+
+def measure(fn, repeat):
+    """Median wall time over `repeat` runs plus peak traced allocations of one run"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _measure(fn, repeat)
+
+
+def _measure(fn, repeat):
+    fn()  # Warm-up: imports, caches, lazy pools
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_s": statistics.median(times), "min_s": min(times), "peak_kb": peak / 1024}
+
+
+def compare(results, baseline, tolerance):
+    """List of regressions: (key, metric, baseline, current)"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("median_s", "peak_kb"):
+            limit = max(base[metric] * (1 + tolerance), base[metric] + MIN_DELTA[metric])
+            if current[metric] > limit:
+                regressions.append((key, metric, base[metric], current[metric]))
+    return regressions
+
+
+def main():
+    import logging
+    logging.disable(logging.CRITICAL)  # Bot logging would dominate the timings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run a subset of benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown/growth, 0.5 = +50%%")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        n_bars, n_pairs = SIZES[size]
+        market = make_market(n_bars, n_pairs)
+        print(f"📏 {size}: {n_bars} bars x {n_pairs} pairs")
+        for name in args.only or BENCHMARKS:
+            stats = measure(BENCHMARKS[name](market), args.repeat)
+            results[f"{size}/{name}"] = stats
+            print(f"  ⏱️ {name:<22} {stats['median_s'] * 1000:10.2f} ms  peak {stats['peak_kb']:10.0f} KB")
+        del market
+        gc.collect()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    if not args.update_baseline and not baseline:
+        print(f"❌ No baseline at {args.baseline} - nothing to compare against. "
+              f"Record one with --update-baseline on this machine first.")
+        return 2
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, base, current in regressions:
+        print(f"❌ {key} {metric}: {base:.4g} -> {current:.4g} ({current / base:.1f}x)")
+    if regressions:
+        return 1
+    print(f"✅ No regressions beyond {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
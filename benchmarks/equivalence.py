@@ -0,0 +1,111 @@
+"""Check the compiled strategy plan against the original hand-written conditions.
+
+    python -m benchmarks.equivalence                # 20 pairs x 300 bars
+    python -m benchmarks.equivalence --pairs 100
+
+The reference conditions below are the lambdas STRATEGY_LIST held before
+strategies became data. Every bar of every synthetic pair is evaluated both
+ways - through run_all_strategies on the growing window and through
+backtest_strategies over the whole history - and any difference is listed.
+Exits non-zero on a mismatch.
+"""
+import argparse
+import sys
+import numpy as np
+from ta.trend import EMAIndicator, MACD
+from ta.momentum import RSIIndicator
+
+from src.utils import vwap
+from benchmarks.bench import make_market
+
+# Warm-up bars skipped: the reference lambdas raise on too-short windows
+MIN_BARS = 30
+
+REFERENCE = {
+    "RSI Oversold Scalp": lambda df: RSIIndicator(df['close'], window=14).rsi().iloc[-1] < 45,
+    "RSI Overbought Scalp": lambda df: RSIIndicator(df['close'], window=14).rsi().iloc[-1] > 55,
+    "EMA Trend Long": lambda df: (
+        EMAIndicator(df['close'], window=9).ema_indicator().iloc[-1] > EMAIndicator(df['close'], window=21).ema_indicator().iloc[-1] and
+        df['close'].iloc[-1] > df['close'].iloc[-2]
+    ),
+    "EMA Trend Short": lambda df: (
+        EMAIndicator(df['close'], window=9).ema_indicator().iloc[-1] < EMAIndicator(df['close'], window=21).ema_indicator().iloc[-1] and
+        df['close'].iloc[-1] < df['close'].iloc[-2]
+    ),
+    "VWAP Long": lambda df: df['close'].iloc[-1] > vwap(df) and df['close'].iloc[-1] > df['open'].iloc[-1],
+    "VWAP Short": lambda df: df['close'].iloc[-1] < vwap(df) and df['close'].iloc[-1] < df['open'].iloc[-1],
+    "MACD Long": lambda df: (
+        MACD(df['close'], window_fast=12, window_slow=26).macd_diff().iloc[-1] > 0 and
+        df['close'].iloc[-1] > df['close'].iloc[-3]
+    ),
+    "MACD Short": lambda df: (
+        MACD(df['close'], window_fast=12, window_slow=26).macd_diff().iloc[-1] < 0 and
+        df['close'].iloc[-1] < df['close'].iloc[-3]
+    ),
+    "Momentum Long": lambda df: (
+        df['close'].iloc[-1] > df['close'].iloc[-2] and
+        df['close'].iloc[-1] > df['open'].iloc[-1] and
+        df['volume'].iloc[-1] > df['volume'].rolling(5).mean().iloc[-1]
+    ),
+    "Momentum Short": lambda df: (
+        df['close'].iloc[-1] < df['close'].iloc[-2] and
+        df['close'].iloc[-1] < df['open'].iloc[-1] and
+        df['volume'].iloc[-1] > df['volume'].rolling(5).mean().iloc[-1]
+    ),
+}
+
+
+def reference_fired(df):
+    fired = []
+    for name, condition in REFERENCE.items():
+        try:
+            if condition(df):
+                fired.append(name)
+        except Exception:
+            continue
+    return fired
+
+
+def check(market):
+    """List of (symbol, bar, source, reference names, compiled names) mismatches"""
+    from src.strategies import STRATEGY_PLAN, run_all_strategies, backtest_strategies
+    names = [s["strategy"] for s in STRATEGY_PLAN.strategies]
+    mismatches = []
+    for (symbol, _), df in market.items():
+        history = backtest_strategies(df)
+        for bar in range(MIN_BARS, len(df)):
+            window = df.iloc[:bar + 1]
+            expected = reference_fired(window)
+            live = [r["strategy"] for r in run_all_strategies(window)]
+            backtest = [names[j] for j in np.flatnonzero(history[bar])]
+            if live != expected:
+                mismatches.append((symbol, bar, "run_all_strategies", expected, live))
+            if backtest != expected:
+                mismatches.append((symbol, bar, "backtest_strategies", expected, backtest))
+        # Pass rates from this pair may re-rank conditions; results must not change
+        STRATEGY_PLAN.reorder()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=300)
+    args = parser.parse_args()
+
+    from src.strategies import STRATEGY_LIST
+    if set(REFERENCE) != {s["name"] for s in STRATEGY_LIST}:
+        print("❌ STRATEGY_LIST no longer matches the reference strategies")
+        return 1
+    mismatches = check(make_market(args.bars, args.pairs))
+    for symbol, bar, source, expected, got in mismatches[:20]:
+        print(f"❌ {symbol} bar {bar} {source}: expected {expected}, got {got}")
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatches")
+        return 1
+    print(f"✅ Compiled plan matches the reference strategies on {args.pairs} pairs x {args.bars} bars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
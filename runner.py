@@ -6,8 +6,8 @@ import logging
 import signal
 import atexit
 import gc
-from datetime import datetime, timezone
-import pandas as pd
+import json
+import numpy as np
 from dotenv import load_dotenv
 
 # Configure logging properly
@@ -24,19 +24,49 @@ logger = logging.getLogger(__name__)
 os.environ['TZ'] = 'UTC'
 time.tzset() if hasattr(time, 'tzset') else None
 
-from src.data import fetch_all_data
-from src.strategies import run_all_strategies
-from src.signal_builder import build_signal, check_trade_exit
-from src.confidence import calculate_confidence
-from src.momentum import calculate_momentum, momentum_category
-from src.cache import SignalCache, TradeCache, StrategyHistory, perform_cache_maintenance
+from src.data import fetch_all_data, closed_candles, last_open_time
+from src.strategies import run_all_strategies, STRATEGY_LIST, STRATEGY_PLAN
+from src.signal_builder import check_trade_exit
+from src.candidates import CandidateTable, candle_timing
+from src.cache import SignalCache, TradeCache, StrategyHistory, EvalState, perform_cache_maintenance
 from src.telegram import TelegramBot
-from src.validation import is_valid_signal
+from src.subscribers import SubscriberRegistry
+from src.validation import rejection_reasons
+from src.journal import SignalJournal
+from src.volume_stats import VolumeStatsStore
+from src.checkpoint import load_checkpoint, write_checkpoint
+from src.market_state import MarketState
+from src.mtf import MultiTimeframeCache, build_views
+from src.scheduler import EvalScheduler
+from src.shadow import ShadowBook, load_shadow_plan
+from src.latency import LatencyTracker, write_run_summary
+from src.exit_monitor import fetch_exit_windows, resolve_trade
+from src.cluster import HashRing, Coordinator, report_candidates, merge_candidates
 
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE", ".cache/subscribers.json")
+SIGNAL_JOURNAL = os.getenv("SIGNAL_JOURNAL", "1") == "1"
+# Evaluate the still-forming candle too (and re-evaluate pairs with no new close)
+INTRABAR = os.getenv("INTRABAR", "0") == "1"
+USE_CHECKPOINT = os.getenv("CHECKPOINT", "1") == "1"
+
+# Sharded mode: ROLE=worker scans its hash shard of SYMBOLS and reports to the
+# coordinator; ROLE=coordinator merges the global top-N, talks to Telegram and
+# owns the trade caches. CLUSTER_WORKERS must list the same ids everywhere.
+ROLE = os.getenv("ROLE", "standalone")
+CLUSTER_ADDRESS = os.getenv("CLUSTER_ADDRESS", "tcp://127.0.0.1:8765")
+CLUSTER_WORKERS = [w for w in os.getenv("CLUSTER_WORKERS", "").split(",") if w]
+WORKER_ID = os.getenv("WORKER_ID", "")
+COLLECT_TIMEOUT = float(os.getenv("COLLECT_TIMEOUT", "240"))
+
+# Activity scheduling: quiet pairs are fetched and evaluated every 2nd/4th candle,
+# and a run fetches at most what fits in its time and request-weight budgets
+SCHEDULE = os.getenv("SCHEDULE", "1") == "1"
+RUN_TIME_BUDGET = float(os.getenv("RUN_TIME_BUDGET", "120"))
+RUN_WEIGHT_BUDGET = int(os.getenv("RUN_WEIGHT_BUDGET", "1200"))
 
 # Support environment-based timeframe filtering
 TIMEFRAME_FILTER = os.getenv("TIMEFRAME")  # e.g., "3m", "5m", "15m"
@@ -51,6 +81,13 @@ if TIMEFRAME_FILTER:
     TIMEFRAMES = [tf for tf in TIMEFRAMES if tf == TIMEFRAME_FILTER]
     print(f"🎯 Filtering to timeframe: {TIMEFRAME_FILTER}")
 
+SHADOW_PLAN = load_shadow_plan()  # None unless SHADOW_STRATEGIES_FILE is set
+if SHADOW_PLAN:
+    print(f"👥 Shadow variants: {SHADOW_PLAN.describe()}")
+
+CANDLE_WINDOW = 200  # Candles fetched and kept per pair
+MARKET = MarketState(capacity=CANDLE_WINDOW)
+
 CONFIDENCE_THRESHOLD = 0.55  # Back to proven working threshold
 MAX_SIGNALS_PER_RUN = MAX_SIGNALS_OVERRIDE
 
@@ -72,6 +109,258 @@ signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 atexit.register(cleanup_on_exit)
 
+def adapt_multipliers(atr_mult, winrate):
+    """Widen SL/TP for strategies that are winning, tighten for losing ones"""
+    if winrate > 0.6:
+        sl_mult = atr_mult['sl'] + 0.2
+        tp_mult = [x + 0.2 for x in atr_mult['tp']]
+    elif winrate < 0.4:
+        sl_mult = max(atr_mult['sl'] - 0.2, 1.0)
+        tp_mult = [max(x - 0.2, 0.8) for x in atr_mult['tp']]
+    else:
+        sl_mult = atr_mult['sl']
+        tp_mult = atr_mult['tp']
+    return sl_mult, tp_mult
+
+def state_files(cache_suffix):
+    """Checkpoint state key -> the JSON file that owns it"""
+    return {
+        "trades": f".cache/active_trades{cache_suffix}.json",
+        "strategy_history": f".cache/strategy_history{cache_suffix}.json",
+        "eval_state": f".cache/eval_state{cache_suffix}.json",
+        "volume_stats": f".cache/volume_stats{cache_suffix}.json",
+    }
+
+def restore_state_files(state, files):
+    """Recreate state files that are missing (e.g. pruned by cache cleanup) from the checkpoint"""
+    for key, path in files.items():
+        if key in state and not os.path.exists(path):
+            with open(path, "w") as f:
+                json.dump(state[key], f)
+            logger.info(f"♻️ Restored {path} from checkpoint")
+
+def direction_filter(strat_results, market_direction):
+    """Strategies that agree with the market direction"""
+    # CRITICAL FIX: Filter strategies by market direction
+    filtered_strategies = []
+    for strat in strat_results:
+        if market_direction == "BULLISH" and strat['side'] == "LONG":
+            filtered_strategies.append(strat)
+        elif market_direction == "BEARISH" and strat['side'] == "SHORT":
+            filtered_strategies.append(strat)
+        elif market_direction == "NEUTRAL":
+            # In neutral market, take the strongest signal only
+            filtered_strategies.append(strat)
+            break  # Only one signal in neutral market
+    return filtered_strategies
+
+def fetch_scheduled(symbols, timeframes, scheduler, run_stats, open_pairs=(), checkpoint=None):
+    """Fetch the pairs due this run (every pair without a scheduler) into MARKET.
+
+    Returns the ring-backed frames of the pairs fetched; the rest of MARKET
+    keeps the candles from earlier runs or the checkpoint.
+    """
+    # Candles live in fixed-size per-pair rings; a long-running process tops them up in place
+    if checkpoint and not len(MARKET):
+        MARKET.ingest(checkpoint.frames())
+    pairs = [(symbol, tf) for symbol in symbols for tf in timeframes]
+    deadline = None
+    if scheduler:
+        pairs, deferred = scheduler.plan(pairs, time.time(), open_pairs)
+        run_stats['pairs_scheduled'] = len(pairs)
+        run_stats['pairs_deferred'] = deferred
+        deadline = run_stats.get('started_at', time.time()) + RUN_TIME_BUDGET
+        logger.info(f"🗓️ {len(pairs)} pairs due, {deferred} deferred by the run budget")
+    fetched = fetch_all_data(symbols, timeframes, warm=MARKET.frames(), pairs=pairs, deadline=deadline)
+    if scheduler:
+        # Pairs the time budget cut off are deferred, not failed fetches (those come back as None)
+        late = sum(1 for pair in pairs if pair not in fetched)
+        run_stats['pairs_scheduled'] -= late
+        run_stats['pairs_deferred'] += late
+    data = MARKET.ingest(fetched)
+    if scheduler:
+        for (symbol, tf), df in data.items():
+            scheduler.observe(symbol, tf, closed_candles(df))
+    return data
+
+def view_fetch_budget(scheduler, run_stats):
+    """on_fetch for build_views: each higher-timeframe fetch spends the run's weight and time budgets"""
+    if not scheduler:
+        return None
+    left = scheduler.spare_fetches(run_stats.get('pairs_scheduled', 0))
+    deadline = run_stats['started_at'] + RUN_TIME_BUDGET
+
+    def charge():
+        nonlocal left
+        if left <= 0 or time.time() >= deadline:
+            run_stats['view_fetches_skipped'] = run_stats.get('view_fetches_skipped', 0) + 1
+            return False
+        left -= 1
+        run_stats['view_fetches'] = run_stats.get('view_fetches', 0) + 1
+        return True
+    return charge
+
+def evaluate_pairs(data, symbols, timeframes, eval_state, volume_stats, winrate_of, run_stats,
+                   shadow_plan=None, shadow_winrate_of=None, views=None):
+    """Run the strategies on every fetched pair with a new closed candle.
+
+    winrate_of(strategy) drives the adaptive SL/TP multipliers. Returns an
+    unfinalized CandidateTable with every candidate, direction-filtered or not.
+    shadow_plan adds shadow variant rows (flagged in table.shadow), scored
+    with shadow_winrate_of. views ({symbol: MultiTimeframeView}) feed the
+    higher-timeframe trend and regime to the strategies and confidence.
+    """
+    candidates = CandidateTable()
+    for symbol in symbols:
+        if shutdown_requested:
+            logger.info("Shutdown requested, stopping signal generation")
+            break
+        for tf in timeframes:
+            if shutdown_requested:
+                logger.info("Shutdown requested, stopping timeframe processing")
+                break
+            df = data.get((symbol, tf))
+            if df is not None and not INTRABAR:
+                df = closed_candles(df)
+            if df is None or len(df) < 100:
+                continue
+            # Nothing new closed since the last run looked at this pair
+            candle_open = last_open_time(df)
+            if not INTRABAR and not eval_state.is_new(symbol, tf, candle_open):
+                run_stats['pairs_unchanged'] += 1
+                continue
+            volume_stats.update(symbol, tf, closed_candles(df))
+
+            # CRITICAL FIX: Determine market direction first
+            price_change_5 = ((df['close'].iloc[-1] - df['close'].iloc[-5]) / df['close'].iloc[-5]) * 100
+            price_change_10 = ((df['close'].iloc[-1] - df['close'].iloc[-10]) / df['close'].iloc[-10]) * 100
+
+            # Determine dominant market direction
+            if price_change_5 > 0.05 and price_change_10 > 0.1:
+                market_direction = "BULLISH"
+            elif price_change_5 < -0.05 and price_change_10 < -0.1:
+                market_direction = "BEARISH"
+            else:
+                market_direction = "NEUTRAL"
+
+            # Higher-timeframe context, built once per symbol for every timeframe
+            htf = views[symbol].features(tf) if views and symbol in views else {}
+            logger.info(f"{symbol} {tf}: Market direction = {market_direction}, "
+                        f"higher timeframe trend = {htf.get('htf_trend', np.nan)}")
+
+            # Shared by the live and shadow plans
+            indicator_values = {
+                ("htf_trend",): htf.get('htf_trend', np.nan),
+                ("htf_regime",): htf.get('htf_regime', np.nan),
+            }
+            strat_results = run_all_strategies(df, indicator_values)
+            filtered_strategies = direction_filter(strat_results, market_direction)
+
+            logger.info(f"{symbol} {tf}: {len(strat_results)} strategies triggered, {len(filtered_strategies)} after direction filter")
+
+            # Historical learning: adapt ATR multipliers per strategy winrate
+            # Direction-filtered strategies stay in the table for the journal only
+            sl_mults, tp_mults, winrates = [], [], []
+            for strat in strat_results:
+                winrate = winrate_of(strat['strategy'])
+                sl_mult, tp_mult = adapt_multipliers(strat['atr_mult'], winrate)
+                sl_mults.append(sl_mult)
+                tp_mults.append(tp_mult)
+                winrates.append(winrate)
+
+            direction_ok = [any(s is strat for s in filtered_strategies) for strat in strat_results]
+            shadow = [False] * len(strat_results)
+
+            # Shadow variants: same bars, same indicator values, tracked but never sent
+            if shadow_plan is not None:
+                shadow_results = shadow_plan.evaluate_last(df, indicator_values)
+                shadow_filtered = direction_filter(shadow_results, market_direction)
+                for strat in shadow_results:
+                    winrate = shadow_winrate_of(strat['strategy'])
+                    sl_mult, tp_mult = adapt_multipliers(strat['atr_mult'], winrate)
+                    sl_mults.append(sl_mult)
+                    tp_mults.append(tp_mult)
+                    winrates.append(winrate)
+                    direction_ok.append(any(s is strat for s in shadow_filtered))
+                    shadow.append(True)
+                strat_results = strat_results + shadow_results
+
+            candidates.add_pair(symbol, tf, df, strat_results, sl_mults, tp_mults, winrates,
+                                direction_ok, market_direction, volume_stats.get(symbol, tf), shadow, htf)
+            eval_state.mark(symbol, tf, candle_open)
+    # Condition order only changes between runs, never in the middle of one
+    STRATEGY_PLAN.reorder()
+    if shadow_plan is not None:
+        shadow_plan.reorder()
+    return candidates
+
+async def deliver_signals(signals, tg, latency, run_stats, signal_cache, trade_cache):
+    """Send signals to Telegram and record them as open trades"""
+    for signal in signals:
+        await tg.send_signal(signal)
+        signal['delivered_at'] = round(time.time(), 3)
+        latency.record("signal", signal['timeframe'], signal)
+        run_stats['signals_sent'] += 1
+        signal_cache.add(signal)
+        trade_cache.add(signal)  # Add to active trades
+
+async def monitor_exits(tg, data, latency, run_stats, cache_suffix, trade_cache, strategy_history, shadow_book=None):
+    """Close this job's open trades whose SL/TP/time exit was hit, resolved on 1m candles.
+
+    Only the job's own trade cache is touched: other timeframe jobs rewrite
+    theirs concurrently and close their own trades from the same 1m history.
+    Shadow trades share the same 1m windows but only update the shadow history.
+    """
+    books = [{"suffix": cache_suffix, "trades": trade_cache, "history": strategy_history}]
+    open_trades = trade_cache.get_all()
+    print(f"📊 Monitoring {len(open_trades)} active trades...")
+    if shadow_book:
+        books.append({"suffix": cache_suffix, "trades": shadow_book.trades, "history": shadow_book.history, "shadow": True})
+        open_trades = open_trades + shadow_book.trades.get_all()
+    windows = fetch_exit_windows(open_trades) if open_trades else {}
+
+    for book in books:
+        for trade in book['trades'].get_all():
+            df = windows.get(trade['symbol'])
+            if df is not None:
+                exit_info = resolve_trade(trade, df)
+            else:
+                # No 1m window - fall back to this run's candles if we have them
+                df = data.get((trade['symbol'], trade['timeframe']))
+                if df is None:
+                    continue
+                exit_info = check_trade_exit(trade, df)
+            if not exit_info['closed']:
+                continue
+            if book.get('shadow'):
+                run_stats['shadow_closed'] += 1
+            else:
+                exit_info.update(candle_timing(df))
+                # Latency runs from the candle that hit the exit, not the newest one in the window
+                if exit_info.get('exit_candle_close') is not None:
+                    exit_info['candle_closed_at'] = (exit_info['exit_candle_close'] + 1) / 1000
+                exit_info['evaluated_at'] = time.time()
+                await tg.send_trade_close(trade, exit_info)
+                exit_info['delivered_at'] = time.time()
+                latency.record("close", trade['timeframe'], exit_info)
+                run_stats['trades_closed'] += 1
+            book['trades'].close(trade['slno'])
+            # Update strategy history
+            profit = exit_info['exit_price'] - trade['entry'] if trade['side'] == "LONG" else trade['entry'] - exit_info['exit_price']
+            book['history'].add(trade['strategy'], {
+                "slno": trade['slno'],
+                "symbol": trade['symbol'],
+                "timeframe": trade['timeframe'],
+                "entry": trade['entry'],
+                "sl": trade['sl'],
+                "tp": trade['tp'],
+                "outcome": exit_info['reason'],
+                "profit": profit,
+                "profit_pct": (profit / trade['entry']) * 100,
+                "timestamp": int(time.time())
+            })
+            print(f"✅ {'Shadow trade' if book.get('shadow') else 'Trade'} {trade['slno']} ({trade['timeframe']}) closed: {exit_info['reason']}")
+
 async def main():
     # Perform cache maintenance at startup
     perform_cache_maintenance()
@@ -82,7 +371,10 @@ async def main():
     print(f"🚀 Starting bot for timeframes: {TIMEFRAMES}")
     print(f"📊 Max signals per run: {MAX_SIGNALS_PER_RUN}")
     
-    tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+    subscribers = SubscriberRegistry(SUBSCRIBERS_FILE)
+    if len(subscribers):
+        print(f"📬 {len(subscribers)} subscribers loaded from {SUBSCRIBERS_FILE}")
+    tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, subscribers)
     
     # Test Telegram connection first
     logger.info("Testing Telegram connection...")
@@ -96,18 +388,47 @@ async def main():
     
     # Use timeframe-specific cache files to avoid conflicts
     cache_suffix = f"_{TIMEFRAME_FILTER}" if TIMEFRAME_FILTER else ""
+    # Warm start: candles, ATR and state from the last run's checkpoint
+    checkpoint_path = f".cache/checkpoint{cache_suffix}.bin"
+    checkpoint = load_checkpoint(checkpoint_path) if USE_CHECKPOINT else None
+    if checkpoint:
+        restore_state_files(checkpoint.state, state_files(cache_suffix))
     signal_cache = SignalCache(f".cache/signal_cache{cache_suffix}.json")
     trade_cache = TradeCache(f".cache/active_trades{cache_suffix}.json")
     strategy_history = StrategyHistory(f".cache/strategy_history{cache_suffix}.json")
+    latency = LatencyTracker(f".cache/latency{cache_suffix}.json")
+    journal = SignalJournal(f".cache/journal{cache_suffix}") if SIGNAL_JOURNAL else None
+    eval_state = EvalState(f".cache/eval_state{cache_suffix}.json")
+    volume_stats = VolumeStatsStore(f".cache/volume_stats{cache_suffix}.json")
+    # One file for every timeframe job: the 15m job's 15m state serves 3m and 5m
+    mtf_cache = MultiTimeframeCache(".cache/mtf.json")
+    scheduler = EvalScheduler(f".cache/schedule{cache_suffix}.json", RUN_TIME_BUDGET, RUN_WEIGHT_BUDGET) if SCHEDULE else None
+    shadow_book = ShadowBook(".cache", cache_suffix) if SHADOW_PLAN else None
+    run_stats = {
+        'timeframe': TIMEFRAME_FILTER or 'ALL',
+        'started_at': time.time(),
+        'pairs_total': len(SYMBOLS) * len(TIMEFRAMES),
+        'pairs_fetched': 0,
+        'pairs_unchanged': 0,
+        'candidates': 0,
+        'signals_sent': 0,
+        'trades_closed': 0,
+        'shadow_opened': 0,
+        'shadow_closed': 0,
+        'error': None,
+    }
 
     try:
         # Validate cache sizes before processing
         print(f"📊 Cache status: Signals={len(signal_cache.cache)}, Trades={len(trade_cache.trades)}")
         
         print(f"📡 Fetching market data for {SYMBOLS} on {TIMEFRAMES}")
-        data = fetch_all_data(SYMBOLS, TIMEFRAMES)
+        fetch_started = time.time()
+        open_pairs = {(t['symbol'], t['timeframe']) for t in trade_cache.get_all()}
+        data = fetch_scheduled(SYMBOLS, TIMEFRAMES, scheduler, run_stats, open_pairs, checkpoint)
+        total_pairs = run_stats.get('pairs_scheduled', len(SYMBOLS) * len(TIMEFRAMES))
         
-        if not data:
+        if not data and total_pairs:
             error_msg = f"🚨 CRITICAL: No market data fetched for any pairs!\nSymbols: {SYMBOLS}\nTimeframes: {TIMEFRAMES}\nThis indicates API failures or geo-blocking."
             print(error_msg)
             await tg.send_error(error_msg)
@@ -115,9 +436,11 @@ async def main():
             
         # Check how many pairs actually got data
         successful_pairs = len([k for k, v in data.items() if v is not None])
-        total_pairs = len(SYMBOLS) * len(TIMEFRAMES)
+        run_stats['pairs_fetched'] = successful_pairs
         
-        if successful_pairs == 0:
+        if not total_pairs:
+            print("💤 No pairs due this run")
+        elif successful_pairs == 0:
             error_msg = f"🚨 CRITICAL: 0/{total_pairs} pairs got data - All APIs failed!"
             print(error_msg)
             await tg.send_error(error_msg)
@@ -128,77 +451,49 @@ async def main():
             await tg._send(warning_msg)
         else:
             print(f"✅ Successfully fetched data for all {successful_pairs} pairs")
-            
-        signals = []
-        for symbol in SYMBOLS:
-            if shutdown_requested:
-                logger.info("Shutdown requested, stopping signal generation")
-                break
-            for tf in TIMEFRAMES:
-                if shutdown_requested:
-                    logger.info("Shutdown requested, stopping timeframe processing")
-                    break
-                df = data.get((symbol, tf))
-                if df is None or len(df) < 100:
-                    continue
-                    
-                # CRITICAL FIX: Determine market direction first
-                price_change_5 = ((df['close'].iloc[-1] - df['close'].iloc[-5]) / df['close'].iloc[-5]) * 100
-                price_change_10 = ((df['close'].iloc[-1] - df['close'].iloc[-10]) / df['close'].iloc[-10]) * 100
-                
-                # Determine dominant market direction
-                if price_change_5 > 0.05 and price_change_10 > 0.1:
-                    market_direction = "BULLISH"
-                elif price_change_5 < -0.05 and price_change_10 < -0.1:
-                    market_direction = "BEARISH"
+
+        fetched_symbols = [symbol for symbol in SYMBOLS if any((symbol, tf) in data for tf in TIMEFRAMES)]
+        views = build_views(fetched_symbols, TIMEFRAMES, MARKET.frames(), mtf_cache,
+                            on_fetch=view_fetch_budget(scheduler, run_stats))
+        mtf_cache.save()
+        candidates = evaluate_pairs(data, SYMBOLS, TIMEFRAMES, eval_state, volume_stats,
+                                    strategy_history.winrate, run_stats,
+                                    SHADOW_PLAN, shadow_book.history.winrate if shadow_book else None, views)
+        if scheduler:
+            # Higher-timeframe fetches cost about as much as a pair's
+            scheduler.record(len(data) + run_stats.get('view_fetches', 0), time.time() - fetch_started)
+
+        # Score, validate, dedupe and rank every candidate in one columnar pass
+        candidates.finalize()
+        reasons = rejection_reasons(candidates, CONFIDENCE_THRESHOLD)
+        reasons[(reasons == "") & ~candidates.direction_ok] = "direction"
+        # Shadow rows that would have been sent open a hypothetical trade instead
+        shadow_rows = candidates.shadow & (reasons == "")
+        reasons[shadow_rows] = "shadow"
+        reasons[(reasons == "") & signal_cache.duplicate_mask(candidates)] = "duplicate"
+        mask = reasons == ""
+        top = candidates.top_k(mask, MAX_SIGNALS_PER_RUN)
+        reasons[mask] = "rank"
+        reasons[top] = "sent"
+        if shadow_book:
+            already_open = shadow_book.open_keys()
+            opened = []
+            for i in np.flatnonzero(shadow_rows):
+                key = (candidates.symbol[i], candidates.timeframe[i], candidates.strategy[i],
+                       "LONG" if candidates.side_long[i] else "SHORT")
+                if key in already_open:
+                    reasons[i] = "shadow_open"
                 else:
-                    market_direction = "NEUTRAL"
-                
-                logger.info(f"{symbol} {tf}: Market direction = {market_direction}")
-                
-                strat_results = run_all_strategies(df)
-                
-                # CRITICAL FIX: Filter strategies by market direction
-                filtered_strategies = []
-                for strat in strat_results:
-                    if market_direction == "BULLISH" and strat['side'] == "LONG":
-                        filtered_strategies.append(strat)
-                    elif market_direction == "BEARISH" and strat['side'] == "SHORT":
-                        filtered_strategies.append(strat)
-                    elif market_direction == "NEUTRAL":
-                        # In neutral market, take the strongest signal only
-                        filtered_strategies.append(strat)
-                        break  # Only one signal in neutral market
-                
-                logger.info(f"{symbol} {tf}: {len(strat_results)} strategies triggered, {len(filtered_strategies)} after direction filter")
-                
-                for strat in filtered_strategies:
-                    # Historical learning: get ATR multipliers for this strategy
-                    hist = strategy_history.get(strat['strategy'])
-                    winrate = strategy_history.winrate(strat['strategy'])
-                    atr_mult = strat['atr_mult']
-                    # Adapt multipliers if winrate is high/low
-                    if winrate > 0.6:
-                        sl_mult = atr_mult['sl'] + 0.2
-                        tp_mult = [x + 0.2 for x in atr_mult['tp']]
-                    elif winrate < 0.4:
-                        sl_mult = max(atr_mult['sl'] - 0.2, 1.0)
-                        tp_mult = [max(x - 0.2, 0.8) for x in atr_mult['tp']]
-                    else:
-                        sl_mult = atr_mult['sl']
-                        tp_mult = atr_mult['tp']
-
-                    signal = build_signal(symbol, tf, df, strat, sl_mult, tp_mult, strategy_history.next_slno())
-                    if not signal:
-                        continue
-                    signal['confidence'] = calculate_confidence(signal, df, winrate)
-                    signal['momentum'] = calculate_momentum(df)
-                    signal['momentum_cat'] = momentum_category(signal['momentum'])
-                    if is_valid_signal(signal, CONFIDENCE_THRESHOLD):
-                        signals.append(signal)
-
-        signals = [s for s in signals if not signal_cache.is_duplicate(s)]
-        signals = sorted(signals, key=lambda x: x['confidence'], reverse=True)[:MAX_SIGNALS_PER_RUN]
+                    already_open.add(key)
+                    opened.append(i)
+            run_stats['shadow_opened'] = shadow_book.open(candidates, opened)
+        if journal:
+            journal.extend(candidates.journal_columns(reasons))
+        logger.info(f"📊 {candidates.size} candidates, {int(mask.sum())} valid, {len(top)} selected")
+        run_stats['candidates'] = candidates.size
+
+        # Only selected rows become signal dicts (and consume a serial number)
+        signals = [candidates.to_signal(i, strategy_history.next_slno()) for i in top]
 
         # Only send signals when REAL strategies trigger - no forced signals
         if len(signals) == 0:
@@ -206,52 +501,170 @@ async def main():
             # No status messages - only send when real signals are generated
 
         print(f"📤 Sending {len(signals)} signals...")
-        if len(signals) > 0:
-            for signal in signals:
-                await tg.send_signal(signal)
-                signal_cache.add(signal)
-                trade_cache.add(signal)  # Add to active trades
+        await deliver_signals(signals, tg, latency, run_stats, signal_cache, trade_cache)
         # No status messages when no signals - only logical signals when strategies trigger
+        eval_state.save()
+        volume_stats.save()
+        if scheduler:
+            scheduler.save()
             
-        open_trades = trade_cache.get_all()
-        print(f"📊 Monitoring {len(open_trades)} active trades...")
-        
-        for trade in open_trades:
-            df = data.get((trade['symbol'], trade['timeframe']))
-            if df is None:
-                continue
-            exit_info = check_trade_exit(trade, df)
-            if exit_info['closed']:
-                await tg.send_trade_close(trade, exit_info)
-                trade_cache.close(trade['slno'])
-                # Update strategy history
-                profit = exit_info['exit_price'] - trade['entry'] if trade['side'] == "LONG" else trade['entry'] - exit_info['exit_price']
-                strategy_history.add(trade['strategy'], {
-                    "slno": trade['slno'],
-                    "entry": trade['entry'],
-                    "sl": trade['sl'],
-                    "tp": trade['tp'],
-                    "outcome": exit_info['reason'],
-                    "profit": profit,
-                    "profit_pct": (profit / trade['entry']) * 100,
-                    "timestamp": int(time.time())
-                })
-                print(f"✅ Trade {trade['slno']} closed: {exit_info['reason']}")
+        await monitor_exits(tg, data, latency, run_stats, cache_suffix, trade_cache, strategy_history, shadow_book)
+
+        if USE_CHECKPOINT:
+            write_checkpoint(checkpoint_path, MARKET.frames(), {
+                "trades": trade_cache.trades,
+                "strategy_history": strategy_history.to_dict(),
+                "eval_state": eval_state.state,
+                "volume_stats": {key: stats.to_dict() for key, stats in volume_stats.stats.items()},
+            })
 
         # Final cache status
         logger.info(f"📈 Final cache status: Signals={len(signal_cache.cache)}, Trades={len(trade_cache.trades)}")
-        
-        # Memory cleanup
-        del data
-        gc.collect()
-        logger.info("Memory cleanup completed")
 
     except Exception as e:
         err = traceback.format_exc()
+        run_stats['error'] = err
         await tg.send_error(f"Bot error ({TIMEFRAME_FILTER or 'ALL'}):\n{err}")
         logging.error(f"Bot error:\n{err}")
         print(f"❌ Error: {err}")
+    finally:
+        if journal:
+            journal.close()
+        # Latency percentiles and a compact run summary for health checks
+        run_stats['finished_at'] = time.time()
+        run_stats['duration'] = round(run_stats['finished_at'] - run_stats['started_at'], 3)
+        latency.save()
+        latency.export_openmetrics(f".cache/metrics{cache_suffix}.prom")
+        summary = write_run_summary(f".cache/run_summary{cache_suffix}.json", run_stats, latency)
+        logger.info(f"🏥 Run summary: healthy={summary['healthy']} {summary['problems']} warnings={summary['warnings']}")
+
+async def worker_main():
+    """Scan this worker's shard and stream the valid candidates to the coordinator"""
+    # An id outside the ring owns no symbols and the coordinator would reject it
+    if WORKER_ID not in CLUSTER_WORKERS:
+        raise ValueError(f"WORKER_ID {WORKER_ID!r} is not in CLUSTER_WORKERS {CLUSTER_WORKERS}")
+    os.makedirs(".cache", exist_ok=True)
+    symbols = HashRing(CLUSTER_WORKERS).shard(SYMBOLS, WORKER_ID)
+    print(f"🧩 Worker {WORKER_ID}: {len(symbols)}/{len(SYMBOLS)} symbols on {TIMEFRAMES}")
+    cache_suffix = f"_{TIMEFRAME_FILTER}_{WORKER_ID}" if TIMEFRAME_FILTER else f"_{WORKER_ID}"
+    checkpoint_path = f".cache/checkpoint{cache_suffix}.bin"
+    checkpoint = load_checkpoint(checkpoint_path) if USE_CHECKPOINT else None
+    eval_state = EvalState(f".cache/eval_state{cache_suffix}.json")
+    volume_stats = VolumeStatsStore(f".cache/volume_stats{cache_suffix}.json")
+    # One file for every timeframe job: the 15m job's 15m state serves 3m and 5m
+    mtf_cache = MultiTimeframeCache(".cache/mtf.json")
+    scheduler = EvalScheduler(f".cache/schedule{cache_suffix}.json", RUN_TIME_BUDGET, RUN_WEIGHT_BUDGET) if SCHEDULE else None
+    journal = SignalJournal(f".cache/journal{cache_suffix}") if SIGNAL_JOURNAL else None
+    run_stats = {'pairs_total': len(symbols) * len(TIMEFRAMES),
+                 'pairs_fetched': 0, 'pairs_unchanged': 0, 'candidates': 0}
+
+    async def evaluate(config):
+        winrates = config.get('winrates', {})
+        # The run budget starts here, not before connecting to the coordinator
+        fetch_started = run_stats['started_at'] = time.time()
+        # Open trades live on the coordinator, so workers schedule by activity alone
+        data = fetch_scheduled(symbols, TIMEFRAMES, scheduler, run_stats, checkpoint=checkpoint)
+        run_stats['pairs_fetched'] = len([v for v in data.values() if v is not None])
+        fetched_symbols = [symbol for symbol in symbols if any((symbol, tf) in data for tf in TIMEFRAMES)]
+        views = build_views(fetched_symbols, TIMEFRAMES, MARKET.frames(), mtf_cache,
+                            on_fetch=view_fetch_budget(scheduler, run_stats))
+        mtf_cache.save()
+        candidates = evaluate_pairs(data, symbols, TIMEFRAMES, eval_state, volume_stats,
+                                    lambda strategy: winrates.get(strategy, 0.5), run_stats, views=views)
+        if scheduler:
+            # Higher-timeframe fetches cost about as much as a pair's
+            scheduler.record(len(data) + run_stats.get('view_fetches', 0), time.time() - fetch_started)
+        candidates.finalize()
+        # Duplicates and the final cut are the coordinator's call
+        reasons = rejection_reasons(candidates, CONFIDENCE_THRESHOLD)
+        reasons[(reasons == "") & ~candidates.direction_ok] = "direction"
+        valid = candidates.top_k(reasons == "", candidates.size)
+        reasons[valid] = "forwarded"
+        if journal:
+            journal.extend(candidates.journal_columns(reasons))
+        run_stats['candidates'] = candidates.size
+        eval_state.save()
+        volume_stats.save()
+        if scheduler:
+            scheduler.save()
+        if USE_CHECKPOINT:
+            write_checkpoint(checkpoint_path, MARKET.frames(), {
+                "eval_state": eval_state.state,
+                "volume_stats": {key: stats.to_dict() for key, stats in volume_stats.stats.items()},
+            })
+        return [candidates.to_signal(i, None) for i in valid], run_stats
+
+    try:
+        rows = await report_candidates(CLUSTER_ADDRESS, WORKER_ID, evaluate)
+        print(f"📨 Worker {WORKER_ID}: reported {len(rows)} candidates")
+    finally:
+        if journal:
+            journal.close()
+
+async def coordinator_main():
+    """Merge every worker's candidates into one global top-N, send it and monitor trades"""
+    perform_cache_maintenance()
+    os.makedirs(".cache", exist_ok=True)
+    tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, SubscriberRegistry(SUBSCRIBERS_FILE))
+    cache_suffix = f"_{TIMEFRAME_FILTER}" if TIMEFRAME_FILTER else ""
+    signal_cache = SignalCache(f".cache/signal_cache{cache_suffix}.json")
+    trade_cache = TradeCache(f".cache/active_trades{cache_suffix}.json")
+    strategy_history = StrategyHistory(f".cache/strategy_history{cache_suffix}.json")
+    latency = LatencyTracker(f".cache/latency{cache_suffix}.json")
+    run_stats = {
+        'timeframe': TIMEFRAME_FILTER or 'ALL',
+        'started_at': time.time(),
+        'pairs_total': len(SYMBOLS) * len(TIMEFRAMES),
+        'pairs_fetched': 0,
+        'pairs_unchanged': 0,
+        'candidates': 0,
+        'signals_sent': 0,
+        'trades_closed': 0,
+        'workers': len(CLUSTER_WORKERS),
+        'workers_reported': 0,
+        'error': None,
+    }
+
+    try:
+        winrates = {s['name']: strategy_history.winrate(s['name']) for s in STRATEGY_LIST}
+        coordinator = Coordinator(CLUSTER_ADDRESS, CLUSTER_WORKERS, winrates)
+        await coordinator.start()
+        rows = await coordinator.collect(COLLECT_TIMEOUT)
+        for stats in coordinator.stats.values():
+            for key in ('pairs_fetched', 'pairs_unchanged', 'candidates'):
+                run_stats[key] += stats.get(key, 0)
+            for key in ('pairs_scheduled', 'pairs_deferred', 'view_fetches', 'view_fetches_skipped'):
+                if key in stats:
+                    run_stats[key] = run_stats.get(key, 0) + stats[key]
+        run_stats['workers_reported'] = len(coordinator.stats)
+
+        selected = merge_candidates(rows, signal_cache.is_duplicate, MAX_SIGNALS_PER_RUN)
+        logger.info(f"📊 {len(rows)} valid candidates from {len(coordinator.stats)} workers, {len(selected)} selected")
+        for signal in selected:
+            # The worker tag is for the merge only, not for trade and signal caches
+            signal.pop('worker', None)
+            signal['slno'] = strategy_history.next_slno()
+        print(f"📤 Sending {len(selected)} signals...")
+        await deliver_signals(selected, tg, latency, run_stats, signal_cache, trade_cache)
+        await monitor_exits(tg, {}, latency, run_stats, cache_suffix, trade_cache, strategy_history)
+    except Exception as e:
+        err = traceback.format_exc()
+        run_stats['error'] = err
+        await tg.send_error(f"Coordinator error ({TIMEFRAME_FILTER or 'ALL'}):\n{err}")
+        logging.error(f"Coordinator error:\n{err}")
+    finally:
+        run_stats['finished_at'] = time.time()
+        run_stats['duration'] = round(run_stats['finished_at'] - run_stats['started_at'], 3)
+        latency.save()
+        latency.export_openmetrics(f".cache/metrics{cache_suffix}.prom")
+        summary = write_run_summary(f".cache/run_summary{cache_suffix}.json", run_stats, latency)
+        logger.info(f"🏥 Run summary: healthy={summary['healthy']} {summary['problems']} warnings={summary['warnings']}")
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    if ROLE == "worker":
+        asyncio.run(worker_main())
+    elif ROLE == "coordinator":
+        asyncio.run(coordinator_main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
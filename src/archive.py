@@ -0,0 +1,235 @@
+import bisect
+import json
+import os
+import numpy as np
+
+# On-disk layout, one directory per (symbol, interval):
+#   <root>/<SYMBOL>/<interval>/<field>.bin     raw little-endian fixed-width values
+#   <root>/<SYMBOL>/<interval>/<field>.<g>.bin the same, for generation g > 0
+#   <root>/<SYMBOL>/<interval>/index.json      generation, row count, dtypes and a sparse open_time index
+# open_time.bin is sorted, so any time window is a contiguous row range and
+# every field can be handed out as an np.memmap slice without copying.
+# Rows beyond index.json's count are ignored, so a crashed append is never visible.
+# A merge writes a whole new generation and publishes it by replacing the index,
+# so a crashed merge is never visible either.
+
+FIELD_DTYPES = {
+    "open_time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<f8",
+    "close_time": "<i8",
+    "quote_volume": "<f8",
+    "trades": "<i8",
+    "taker_base_vol": "<f8",
+    "taker_quote_vol": "<f8",
+}
+INDEX_STRIDE = 4096  # One sparse index entry per this many rows
+
+
+class CandleArchive:
+    """Append-only columnar candle store with zero-copy window reads.
+
+    Readers in any number of processes share the same file pages through the
+    OS page cache; nothing is parsed or copied until a caller asks for it.
+    """
+
+    def __init__(self, root=".cache/history"):
+        self.root = root
+        self._maps = {}
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol, interval)
+
+    def _index_path(self, symbol, interval):
+        return os.path.join(self._dir(symbol, interval), "index.json")
+
+    def _field_path(self, symbol, interval, name, generation=0):
+        filename = f"{name}.bin" if not generation else f"{name}.{generation}.bin"
+        return os.path.join(self._dir(symbol, interval), filename)
+
+    def index(self, symbol, interval):
+        path = self._index_path(symbol, interval)
+        if not os.path.exists(path):
+            return {"count": 0, "fields": FIELD_DTYPES, "stride": INDEX_STRIDE, "sparse": []}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write_index(self, symbol, interval, index):
+        path = self._index_path(symbol, interval)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, path)
+
+    def symbols(self):
+        """(symbol, interval) pairs present in the archive"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (symbol, interval)
+            for symbol in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, symbol))
+            for interval in os.listdir(os.path.join(self.root, symbol))
+            if os.path.exists(self._index_path(symbol, interval))
+        )
+
+    # -- writing --------------------------------------------------------
+
+    def append(self, symbol, interval, cols):
+        """Append rows newer than the last stored open_time; returns rows written.
+
+        cols is a dict of arrays keyed by FIELD_DTYPES names, sorted by open_time.
+        """
+        index = self.index(symbol, interval)
+        count = index["count"]
+        open_time = np.asarray(cols["open_time"], dtype=np.int64)
+        if count:
+            keep = open_time > index["last_open_time"]
+            cols = {name: np.asarray(values)[keep] for name, values in cols.items()}
+            open_time = open_time[keep]
+        if len(open_time) == 0:
+            return 0
+
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        generation = index.get("generation", 0)
+        for name, dtype in FIELD_DTYPES.items():
+            path = self._field_path(symbol, interval, name, generation)
+            itemsize = np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                # Drop bytes from an append that crashed before the index was updated
+                if f.tell() != count * itemsize:
+                    f.truncate(count * itemsize)
+                f.write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+
+        stride = index.get("stride", INDEX_STRIDE)
+        sparse = index.get("sparse", [])
+        for row in range(-(-count // stride) * stride, count + len(open_time), stride):
+            sparse.append(int(open_time[row - count]))
+        new_count = count + len(open_time)
+        self._write_index(symbol, interval, {
+            "generation": generation,
+            "count": new_count,
+            "fields": FIELD_DTYPES,
+            "first_open_time": index.get("first_open_time", int(open_time[0])),
+            "last_open_time": int(open_time[-1]),
+            "stride": stride,
+            "sparse": sparse,
+        })
+        return len(open_time)
+
+    def merge(self, symbol, interval, cols):
+        """Merge rows anywhere in time (e.g. an older backfill) by rewriting the series.
+
+        The merged columns are written and fsynced as the next generation's
+        files, and replacing the index publishes them all at once. A crash
+        before that leaves the old generation and index untouched; readers
+        that have the old files mapped keep a valid (old) view after they
+        are unlinked.
+        """
+        index = self.index(symbol, interval)
+        if not index["count"] or np.asarray(cols["open_time"])[0] > index["last_open_time"]:
+            return self.append(symbol, interval, cols)
+
+        existing = self.window(symbol, interval)
+        combined = {name: np.concatenate([np.asarray(existing[name]), np.asarray(cols[name], dtype=dtype)])
+                    for name, dtype in FIELD_DTYPES.items()}
+        order = np.argsort(combined["open_time"], kind="stable")
+        combined = {name: values[order] for name, values in combined.items()}
+        keep = np.r_[True, np.diff(combined["open_time"]) != 0]
+        combined = {name: values[keep] for name, values in combined.items()}
+        del existing
+        self._maps.clear()
+
+        directory = self._dir(symbol, interval)
+        generation = index.get("generation", 0) + 1
+        for name, dtype in FIELD_DTYPES.items():
+            with open(self._field_path(symbol, interval, name, generation), "wb") as f:
+                f.write(np.ascontiguousarray(combined[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        _fsync_dir(directory)
+
+        open_time = combined["open_time"]
+        stride = index.get("stride", INDEX_STRIDE)
+        self._write_index(symbol, interval, {
+            "generation": generation,
+            "count": int(len(open_time)),
+            "fields": FIELD_DTYPES,
+            "first_open_time": int(open_time[0]),
+            "last_open_time": int(open_time[-1]),
+            "stride": stride,
+            "sparse": [int(t) for t in open_time[::stride]],
+        })
+        # Older generations, including ones left by a merge that crashed after publishing
+        current = {os.path.basename(self._field_path(symbol, interval, name, generation)) for name in FIELD_DTYPES}
+        for filename in os.listdir(directory):
+            if filename.endswith(".bin") and filename not in current:
+                os.remove(os.path.join(directory, filename))
+        return int(len(open_time))
+
+    # -- reading --------------------------------------------------------
+
+    def _memmap(self, symbol, interval, name, index):
+        path = self._field_path(symbol, interval, name, index.get("generation", 0))
+        count = index["count"]
+        key = (path, count)
+        if key not in self._maps:
+            # Re-map only when another writer has grown the series or merged a new generation
+            self._maps = {k: v for k, v in self._maps.items() if k[0] != path}
+            self._maps[key] = np.memmap(path, dtype=FIELD_DTYPES[name], mode="r", shape=(count,))
+        return self._maps[key]
+
+    def row_range(self, symbol, interval, start=None, end=None, index=None):
+        """Row slice [lo, hi) covering open_time in [start, end)"""
+        index = index or self.index(symbol, interval)
+        count = index["count"]
+        if count == 0:
+            return 0, 0
+        open_time = self._memmap(symbol, interval, "open_time", index)
+        stride = index.get("stride", INDEX_STRIDE)
+
+        def locate(t):
+            # Sparse index narrows the search to one block of the memmap
+            block = max(bisect.bisect_right(index["sparse"], t) - 1, 0)
+            lo = block * stride
+            hi = min(lo + stride, count)
+            return lo + int(np.searchsorted(open_time[lo:hi], t, side="left"))
+
+        lo = 0 if start is None else locate(start)
+        hi = count if end is None else locate(end)
+        return lo, max(lo, hi)
+
+    def window(self, symbol, interval, start=None, end=None, fields=None):
+        """Zero-copy views of open_time in [start, end) (ms) - dict of np.memmap slices"""
+        index = self.index(symbol, interval)
+        lo, hi = self.row_range(symbol, interval, start, end, index)
+        fields = fields or list(FIELD_DTYPES)
+        if index["count"] == 0:
+            return {name: np.empty(0, dtype=FIELD_DTYPES[name]) for name in fields}
+        return {name: self._memmap(symbol, interval, name, index)[lo:hi] for name in fields}
+
+    def last(self, symbol, interval, n, fields=None):
+        """Zero-copy views of the latest n candles"""
+        index = self.index(symbol, interval)
+        count = index["count"]
+        fields = fields or list(FIELD_DTYPES)
+        if count == 0:
+            return {name: np.empty(0, dtype=FIELD_DTYPES[name]) for name in fields}
+        return {name: self._memmap(symbol, interval, name, index)[max(count - n, 0):] for name in fields}
+
+
+def _fsync_dir(directory):
+    """Make the new files' directory entries durable before the index points at them"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,235 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import numpy as np
+from src.archive import CandleArchive, FIELD_DTYPES
+from src.data import fetch_klines, INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000  # Binance max klines per request
+
+# Binance request weight: klines cost 2, IP budget 6000/min. Stay well under it
+# so a live bot sharing the IP never gets throttled.
+KLINE_WEIGHT = 2
+WEIGHT_PER_MINUTE = int(os.getenv("BACKFILL_WEIGHT_PER_MINUTE", "4800"))
+
+# Columnar output: one array per field, stored in the candle archive
+FIELDS = {name: np.dtype(dtype) for name, dtype in FIELD_DTYPES.items()}
+
+
+class WeightLimiter:
+    """Thread-safe token bucket over the per-minute request weight budget"""
+
+    def __init__(self, per_minute=WEIGHT_PER_MINUTE):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=KLINE_WEIGHT):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def plan_pages(start_ms, end_ms, interval):
+    """Split [start_ms, end_ms) into (page_start, page_end) windows of PAGE_SIZE candles"""
+    step = INTERVAL_MS[interval]
+    start_ms = (start_ms // step) * step  # Align to candle boundaries
+    page_span = step * PAGE_SIZE
+    return [(s, min(s + page_span, end_ms) - 1) for s in range(start_ms, end_ms, page_span)]
+
+
+def page_to_columns(df):
+    """fetch_klines DataFrame -> dict of typed numpy arrays"""
+    if len(df) == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in FIELDS.items()}
+    cols = {
+        "open_time": df.index.values.astype("datetime64[ms]").astype(np.int64),
+        "quote_volume": df["qav"].to_numpy(),
+    }
+    for name in FIELDS:
+        if name not in cols:
+            cols[name] = df[name].to_numpy()
+    return {name: np.asarray(cols[name]).astype(dtype) for name, dtype in FIELDS.items()}
+
+
+def check_series(open_time, interval):
+    """Return (gaps, duplicates) for a sorted open_time array.
+
+    gaps is a list of (after_open_time, missing_candles).
+    """
+    step = INTERVAL_MS[interval]
+    diffs = np.diff(open_time)
+    duplicates = int((diffs == 0).sum())
+    gap_idx = np.flatnonzero(diffs > step)
+    gaps = [(int(open_time[i]), int(diffs[i] // step) - 1) for i in gap_idx]
+    return gaps, duplicates
+
+
+class BackfillJob:
+    """Resumable download of one (symbol, interval) range.
+
+    Each finished page is saved as its own .npz under pages/ and listed in
+    checkpoint.json by its (start, end) window, so an interrupted job only
+    fetches what is missing. A partial last page whose end moved (e.g. the
+    default --end of now on a rerun) is a different window and is fetched again.
+    """
+
+    def __init__(self, out_dir, symbol, interval, start_ms, end_ms):
+        self.symbol = symbol
+        self.interval = interval
+        self.dir = os.path.join(out_dir, "_jobs", f"{symbol}_{interval}")
+        self.pages_dir = os.path.join(self.dir, "pages")
+        self.checkpoint_path = os.path.join(self.dir, "checkpoint.json")
+        os.makedirs(self.pages_dir, exist_ok=True)
+        self.pages = plan_pages(start_ms, end_ms, interval)
+        self.done = set()
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r") as f:
+                done = json.load(f).get("done", [])
+            # Older checkpoints list page starts only; those are only safe for full pages
+            full_span = INTERVAL_MS[interval] * PAGE_SIZE - 1
+            self.done = {tuple(d) if isinstance(d, list) else (d, d + full_span) for d in done}
+        self.lock = threading.Lock()
+
+    def pending(self):
+        return [p for p in self.pages if p not in self.done]
+
+    def fetch_page(self, page, limiter):
+        start, end = page
+        # Charged per HTTP attempt, so retries and mirror fallbacks stay inside the budget
+        df = fetch_klines(self.symbol, self.interval, limit=PAGE_SIZE, start_time=start, end_time=end, min_candles=0,
+                          on_request=limiter.acquire)
+        if df is None:
+            raise RuntimeError(f"{self.symbol} {self.interval} page {start} failed on all APIs")
+        cols = page_to_columns(df)
+        path = os.path.join(self.pages_dir, f"{start}.npz")
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, **cols)
+        os.replace(tmp, path)
+        return len(cols["open_time"])
+
+    def mark_done(self, page):
+        with self.lock:
+            self.done.add(tuple(page))
+            tmp = self.checkpoint_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"done": [list(p) for p in sorted(self.done)]}, f)
+            os.replace(tmp, self.checkpoint_path)
+
+    def store(self, archive, cols):
+        """Append the rows past the archive's end; rewrite the series only for rows it lacks before that"""
+        index = archive.index(self.symbol, self.interval)
+        if index["count"]:
+            open_time = cols["open_time"]
+            older = open_time <= index["last_open_time"]
+            if older.any():
+                stored = archive.window(self.symbol, self.interval, int(open_time[older][0]),
+                                        index["last_open_time"] + 1, fields=["open_time"])["open_time"]
+                if not np.isin(open_time[older], stored).all():
+                    return archive.merge(self.symbol, self.interval, cols)
+                cols = {name: values[~older] for name, values in cols.items()}
+        return archive.append(self.symbol, self.interval, cols)
+
+    def merge(self, archive):
+        """Combine finished pages into one sorted, de-duplicated series and store it in the archive"""
+        parts = []
+        for start, _ in self.pages:
+            path = os.path.join(self.pages_dir, f"{start}.npz")
+            if os.path.exists(path):
+                with np.load(path) as page:
+                    parts.append({name: page[name] for name in FIELDS})
+        cols = {name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype=dtype)
+                for name, dtype in FIELDS.items()}
+
+        order = np.argsort(cols["open_time"], kind="stable")
+        cols = {name: values[order] for name, values in cols.items()}
+        gaps, duplicates = check_series(cols["open_time"], self.interval)
+        if duplicates:
+            keep = np.r_[True, np.diff(cols["open_time"]) != 0]
+            cols = {name: values[keep] for name, values in cols.items()}
+
+        written = self.store(archive, cols) if len(cols["open_time"]) else 0
+        meta = {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "count": int(len(cols["open_time"])),
+            "first_open_time": int(cols["open_time"][0]) if len(cols["open_time"]) else None,
+            "last_open_time": int(cols["open_time"][-1]) if len(cols["open_time"]) else None,
+            "written": written,
+            "duplicates_removed": duplicates,
+            "gaps": gaps,
+        }
+        with open(os.path.join(self.dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+def backfill(symbols, interval, start_ms, end_ms, out_dir=".cache/history", workers=8):
+    """Download [start_ms, end_ms) for every symbol concurrently within the weight budget"""
+    limiter = WeightLimiter()
+    archive = CandleArchive(out_dir)
+    jobs = [BackfillJob(out_dir, symbol, interval, start_ms, end_ms) for symbol in symbols]
+    tasks = [(job, page) for job in jobs for page in job.pending()]
+    total_pages = sum(len(job.pages) for job in jobs)
+    print(f"📥 Backfill {len(symbols)} symbols {interval}: {len(tasks)}/{total_pages} pages to fetch")
+
+    failed = 0
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job.fetch_page, page, limiter): (job, page) for job, page in tasks}
+        for n, future in enumerate(as_completed(futures), 1):
+            job, page = futures[future]
+            try:
+                future.result()
+                job.mark_done(page)
+            except Exception as e:
+                failed += 1
+                logger.error(f"❌ {e}")
+            if n % 100 == 0:
+                print(f"  ⏳ {n}/{len(tasks)} pages ({time.time() - started:.0f}s)")
+
+    results = {}
+    for job in jobs:
+        meta = job.merge(archive)
+        results[job.symbol] = meta
+        gap_candles = sum(missing for _, missing in meta["gaps"])
+        print(f"  ✅ {job.symbol}: {meta['count']} candles, {len(meta['gaps'])} gaps ({gap_candles} missing), "
+              f"{meta['duplicates_removed']} duplicates removed")
+    if failed:
+        print(f"⚠️ {failed} pages failed - re-run the same command to resume")
+    return results
+
+
+def _parse_date(value):
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download historical klines into the candle archive")
+    parser.add_argument("symbols", nargs="+", help="e.g. BTCUSDT ETHUSDT")
+    parser.add_argument("--interval", default="1m", choices=sorted(INTERVAL_MS))
+    parser.add_argument("--start", required=True, help="UTC date/time, e.g. 2025-01-01")
+    parser.add_argument("--end", default=None, help="UTC date/time (default: now)")
+    parser.add_argument("--out", default=".cache/history")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s UTC - %(levelname)s - %(message)s')
+    end_ms = _parse_date(args.end) if args.end else int(time.time() * 1000)
+    backfill(args.symbols, args.interval, _parse_date(args.start), end_ms, args.out, args.workers)
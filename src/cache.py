@@ -2,6 +2,7 @@ import json
 import os
 import time
 import logging
+import numpy as np
 
 def safe_load_json(path, default):
     if not os.path.exists(path) or os.path.getsize(path) == 0:
@@ -15,6 +16,12 @@ def safe_load_json(path, default):
                 json.dump(default, f2)
             return default
 
+# History files hold months of rollups, so age-based cache cleanup skips them
+PERSISTENT_PREFIXES = ("strategy_history", "shadow_history")
+
+def is_persistent(filename):
+    return filename.startswith(PERSISTENT_PREFIXES)
+
 def cleanup_old_files(directory=".cache", max_age_hours=24):
     """Remove old cache files to prevent storage bloat"""
     if not os.path.exists(directory):
@@ -28,7 +35,7 @@ def cleanup_old_files(directory=".cache", max_age_hours=24):
         file_path = os.path.join(directory, filename)
         if os.path.isfile(file_path):
             file_age = current_time - os.path.getmtime(file_path)
-            if file_age > max_age_seconds and filename.endswith('.json'):
+            if file_age > max_age_seconds and filename.endswith('.json') and not is_persistent(filename):
                 try:
                     os.remove(file_path)
                     cleaned_count += 1
@@ -77,6 +84,22 @@ class SignalCache:
                 return True
         return False
 
+    def duplicate_mask(self, table):
+        """Vectorized is_duplicate over a CandidateTable - one set lookup per row"""
+        now = int(time.time())
+        recent = {
+            (s.get('symbol'), s.get('timeframe'), s.get('side'))
+            for s in self.cache
+            if now - s['opened_at'] < 3600  # 1 hour for scalping
+        }
+        if not recent:
+            return np.zeros(table.size, dtype=bool)
+        sides = np.where(table.side_long, "LONG", "SHORT")
+        return np.fromiter(
+            ((sym, tf, side) in recent for sym, tf, side in zip(table.symbol, table.timeframe, sides)),
+            dtype=bool, count=table.size
+        )
+
     def add(self, signal):
         self.cache.append({
             'slno': signal['slno'], 
@@ -147,44 +170,120 @@ class TradeCache:
         with open(self.path, "w") as f:
             json.dump(self.trades, f)
 
+# Strategy history tiers: raw records for recent trades, then hourly and daily
+# rollups per (strategy, symbol, timeframe, outcome). Nothing is deleted until
+# it falls out of the daily tier, so winrates survive quiet spells.
+HOURLY_RETENTION_DAYS = 30
+DAILY_RETENTION_DAYS = 365
+MAX_ROLLUP_BUCKETS = 2000     # Per tier - bounds the file whatever the trade rate
+COMPACT_INTERVAL = 3600       # Seconds between incremental compactions
+def _is_win(outcome):
+    return "TP" in outcome
+
 class StrategyHistory:
     def __init__(self, path):
         self.path = path
-        self.history = safe_load_json(self.path, {})
-        self.max_records_per_strategy = 30  # Reduced from 50
-        self.max_age_days = 7  # Keep only last 7 days
+        self.max_records_per_strategy = 30  # Raw records kept per strategy
+        self.max_age_days = 7  # Raw records older than this are rolled up
+        data = safe_load_json(self.path, {})
+        if data.get("_format") == 2:
+            self.history = data.get("raw", {})
+            self.hourly = data.get("hourly", {})
+            self.daily = data.get("daily", {})
+            self.compacted_at = data.get("compacted_at", 0)
+        else:
+            # Old layout: {strategy: [records]}
+            self.history = data
+            self.hourly, self.daily, self.compacted_at = {}, {}, 0
+        self._count()
         self._cleanup_old_records()
 
+    def _count(self):
+        """Rebuild the O(1) counters: raw [wins, n] and all-tier [n, wins, profit_pct] per strategy"""
+        self.raw_counts = {}
+        self.totals = {}
+        for strategy, records in self.history.items():
+            for record in records:
+                self._tally(self.raw_counts, strategy, record.get("outcome", ""), 1)
+                self._total(strategy, record.get("outcome", ""), 1, record.get("profit_pct", 0))
+        for tier in (self.hourly, self.daily):
+            for key, (n, _, profit_pct) in tier.items():
+                _, strategy, _, _, outcome = key.split("|", 4)
+                self._total(strategy, outcome, n, profit_pct)
+
+    def _tally(self, counts, strategy, outcome, n):
+        c = counts.setdefault(strategy, [0, 0])
+        c[0] += n if _is_win(outcome) else 0
+        c[1] += n
+
+    def _total(self, strategy, outcome, n, profit_pct):
+        t = self.totals.setdefault(strategy, [0, 0, 0.0])
+        t[0] += n
+        t[1] += n if _is_win(outcome) else 0
+        t[2] += profit_pct
+
+    def _roll_up(self, strategy, record):
+        """Move a raw record into its hourly bucket (totals are unchanged)"""
+        outcome = record.get("outcome", "")
+        self._tally(self.raw_counts, strategy, outcome, -1)
+        hour = int(record.get("timestamp", 0)) // 3600 * 3600
+        key = f"{hour}|{strategy}|{record.get('symbol', '?')}|{record.get('timeframe', '?')}|{outcome}"
+        bucket = self.hourly.setdefault(key, [0, 0.0, 0.0])
+        bucket[0] += 1
+        bucket[1] = round(bucket[1] + record.get("profit", 0), 8)
+        bucket[2] = round(bucket[2] + record.get("profit_pct", 0), 6)
+
     def _cleanup_old_records(self):
-        """Remove old strategy records to prevent bloat"""
+        """Roll raw records past max_age_days or max_records_per_strategy into the hourly tier"""
         current_time = int(time.time())
         max_age_seconds = self.max_age_days * 24 * 3600
-        cleaned_strategies = 0
+        rolled = 0
         
         for strategy in list(self.history.keys()):
-            records = self.history[strategy]
-            initial_count = len(records)
-            
-            # Remove old records
-            records = [
-                record for record in records
-                if current_time - record.get('timestamp', 0) < max_age_seconds
-            ]
-            
-            # Keep only recent records per strategy
-            if len(records) > self.max_records_per_strategy:
-                records = sorted(records, key=lambda x: x.get('timestamp', 0))
-                records = records[-self.max_records_per_strategy:]
-            
-            self.history[strategy] = records
-            
-            if len(records) < initial_count:
-                cleaned_strategies += 1
+            records = sorted(self.history[strategy], key=lambda x: x.get('timestamp', 0))
+            keep_from = max(len(records) - self.max_records_per_strategy, 0)
+            while keep_from < len(records) and current_time - records[keep_from].get('timestamp', 0) >= max_age_seconds:
+                keep_from += 1
+            for record in records[:keep_from]:
+                self._roll_up(strategy, record)
+            self.history[strategy] = records[keep_from:]
+            rolled += keep_from
                 
-        if cleaned_strategies > 0:
-            print(f"🗑️ Cleaned records for {cleaned_strategies} strategies")
+        if self._compact(current_time) or rolled:
+            if rolled:
+                print(f"📦 Rolled {rolled} strategy records into hourly aggregates")
             self._save()
 
+    def _compact(self, now, force=False):
+        """Hourly buckets past retention -> daily; daily past retention dropped. Runs at most hourly."""
+        if not force and now - self.compacted_at < COMPACT_INTERVAL:
+            return False
+        self.compacted_at = now
+        hourly_cutoff = now - HOURLY_RETENTION_DAYS * 86400
+        hourly = sorted(self.hourly, key=lambda k: int(k.split("|", 1)[0]))
+        overflow = max(len(hourly) - MAX_ROLLUP_BUCKETS, 0)
+        for i, key in enumerate(hourly):
+            if i >= overflow and int(key.split("|", 1)[0]) >= hourly_cutoff:
+                break
+            ts, rest = key.split("|", 1)
+            day_key = f"{int(ts) // 86400 * 86400}|{rest}"
+            n, profit, profit_pct = self.hourly.pop(key)
+            bucket = self.daily.setdefault(day_key, [0, 0.0, 0.0])
+            bucket[0] += n
+            bucket[1] = round(bucket[1] + profit, 8)
+            bucket[2] = round(bucket[2] + profit_pct, 6)
+
+        daily_cutoff = now - DAILY_RETENTION_DAYS * 86400
+        daily = sorted(self.daily, key=lambda k: int(k.split("|", 1)[0]))
+        overflow = max(len(daily) - MAX_ROLLUP_BUCKETS, 0)
+        for i, key in enumerate(daily):
+            if i >= overflow and int(key.split("|", 1)[0]) >= daily_cutoff:
+                break
+            n, _, profit_pct = self.daily.pop(key)
+            _, strategy, _, _, outcome = key.split("|", 4)
+            self._total(strategy, outcome, -n, -profit_pct)
+        return True
+
     def get(self, strategy):
         return self.history.get(strategy, [])
 
@@ -193,19 +292,35 @@ class StrategyHistory:
             self.history[strategy] = []
             
         self.history[strategy].append(record)
+        self._tally(self.raw_counts, strategy, record.get("outcome", ""), 1)
+        self._total(strategy, record.get("outcome", ""), 1, record.get("profit_pct", 0))
         
-        # Auto-cleanup when adding
-        if len(self.history[strategy]) > self.max_records_per_strategy:
-            self.history[strategy] = self.history[strategy][-self.max_records_per_strategy:]
+        # Oldest raw records beyond the cap move to the hourly tier
+        while len(self.history[strategy]) > self.max_records_per_strategy:
+            self._roll_up(strategy, self.history[strategy].pop(0))
+        self._compact(int(time.time()))
             
         self._save()
 
     def winrate(self, strategy):
-        hist = self.get(strategy)
-        if not hist:
-            return 0.5
-        wins = sum(1 for s in hist if "TP" in s.get("outcome", ""))
-        return wins / len(hist)
+        """Winrate over the recent raw records, else over every retained tier, else 0.5 - O(1)"""
+        wins, n = self.raw_counts.get(strategy, (0, 0))
+        if n:
+            return wins / n
+        n, wins, _ = self.totals.get(strategy, (0, 0, 0.0))
+        return wins / n if n else 0.5
+
+    def stats(self, strategy):
+        """Trades, wins and summed profit % across raw records and rollups"""
+        n, wins, profit_pct = self.totals.get(strategy, (0, 0, 0.0))
+        return {"trades": n, "wins": wins, "profit_pct": profit_pct}
+
+    def strategies(self):
+        return sorted(s for s, t in self.totals.items() if t[0] > 0)
+
+    def to_dict(self):
+        return {"_format": 2, "raw": self.history, "hourly": self.hourly, "daily": self.daily,
+                "compacted_at": self.compacted_at}
 
     def next_slno(self):
         # Returns a 2-digit serial number as string, rolling from 01-99
@@ -228,9 +343,30 @@ class StrategyHistory:
         except:
             return "01"
 
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, self.path)
+
+class EvalState:
+    """Last evaluated candle open_time (ms) per symbol/timeframe, so unchanged pairs are skipped"""
+    def __init__(self, path):
+        self.path = path
+        self.state = safe_load_json(self.path, {})
+
+    def is_new(self, symbol, timeframe, open_time_ms):
+        return open_time_ms > self.state.get(f"{symbol}|{timeframe}", -1)
+
+    def mark(self, symbol, timeframe, open_time_ms):
+        self.state[f"{symbol}|{timeframe}"] = int(open_time_ms)
+
+    def save(self):
+        self._save()
+
     def _save(self):
         with open(self.path, "w") as f:
-            json.dump(self.history, f)
+            json.dump(self.state, f)
 
 def perform_cache_maintenance():
     """Comprehensive cache cleanup - call this at bot startup"""
@@ -279,7 +415,7 @@ def aggressive_cleanup():
         file_path = os.path.join(cache_dir, filename)
         if os.path.isfile(file_path):
             file_age = current_time - os.path.getmtime(file_path)
-            if file_age > max_age_seconds:
+            if file_age > max_age_seconds and not is_persistent(filename):
                 try:
                     os.remove(file_path)
                     print(f"🗑️ Aggressively cleaned: {filename}")
@@ -0,0 +1,199 @@
+import time
+import numpy as np
+from src.confidence import confidence_features, score_confidence
+from src.momentum import calculate_momentum, momentum_category
+
+# Per-pair columns shared by every strategy that fired on that pair
+PAIR_FEATURES = ['vol_ratio', 'vol_pct', 'body_pct', 'atr_pct', 'rsi', 'ema_fast', 'ema_slow', 'htf_trend', 'htf_regime']
+TIMING_FIELDS = ['candle_closed_at', 'fetched_at', 'evaluated_at']
+
+
+def candle_timing(df, now=None):
+    """Close of the last closed candle and fetch-completion time (epoch seconds) for latency tracking.
+
+    A still-forming last candle (INTRABAR runs) closes in the future, so the
+    candle before it is the one the latency is measured from.
+    """
+    closed_at = np.nan
+    if 'close_time' in df and len(df):
+        close_time = np.asarray(df['close_time'], dtype=float)[-2:]
+        closed = close_time[close_time < (now or time.time()) * 1000]
+        if len(closed):
+            closed_at = (float(closed[-1]) + 1) / 1000
+    fetched_at = getattr(df, 'attrs', {}).get('fetched_at', np.nan)
+    return {'candle_closed_at': closed_at, 'fetched_at': fetched_at}
+
+
+class CandidateTable:
+    """Columnar table of candidate signals for one run.
+
+    Pair-level inputs (entry, ATR, confidence features, momentum) are computed
+    once per (symbol, timeframe) and every strategy row points back to its pair.
+    Scoring, validation and ranking all run over whole arrays; signal dicts
+    are only materialised for the rows that actually get sent.
+    """
+
+    def __init__(self):
+        self._pairs = []
+        self._rows = []
+        self.size = 0
+
+    def add_pair(self, symbol, tf, df, strategies, sl_mults, tp_mults, winrates, direction_ok=None, market_direction="",
+                 volume_stats=None, shadow=None, htf=None):
+        """Add every strategy that fired on one pair, sharing the pair's features.
+
+        direction_ok flags the strategies that survived the market-direction
+        filter; the others are kept (for the journal) but never selected.
+        volume_stats is the pair's streaming VolumeStats, if tracked. shadow
+        flags rows from shadow strategy variants, which are scored and
+        validated like the rest but never sent. htf holds the pair's
+        higher-timeframe features from its MultiTimeframeView.
+        """
+        if not strategies:
+            return
+        close = np.asarray(df['close'], dtype=float)
+        atr = np.asarray(df['ATR'], dtype=float)
+        try:
+            momentum = calculate_momentum(df)
+        except ValueError:
+            momentum = np.nan  # Not enough candles for RSI/Stochastic
+        pair = {
+            'symbol': symbol,
+            'timeframe': tf,
+            'entry': float(close[-1]),
+            'atr': float(atr[-1]),
+            'candle_count': len(close),
+            'momentum': momentum,
+            'market_direction': market_direction,
+        }
+        pair.update(confidence_features(df, volume_stats, htf))
+        pair.update(candle_timing(df))
+        pair['evaluated_at'] = time.time()
+        pair_idx = len(self._pairs)
+        self._pairs.append(pair)
+
+        if direction_ok is None:
+            direction_ok = [True] * len(strategies)
+        if shadow is None:
+            shadow = [False] * len(strategies)
+        for strat, sl_mult, tp_mult, winrate, ok, is_shadow in zip(strategies, sl_mults, tp_mults, winrates, direction_ok, shadow):
+            self._rows.append((pair_idx, strat['strategy'], strat['side'] == "LONG", sl_mult, list(tp_mult), winrate, ok, is_shadow))
+        self.size = len(self._rows)
+
+    def finalize(self):
+        """Turn the accumulated rows into arrays and compute SL/TP, confidence and momentum"""
+        n = self.size
+        pairs = self._pairs
+        width = max((len(r[4]) for r in self._rows), default=1)
+
+        self.pair_idx = np.fromiter((r[0] for r in self._rows), dtype=np.int64, count=n)
+        self.strategy = np.array([r[1] for r in self._rows], dtype=object)
+        self.side_long = np.fromiter((r[2] for r in self._rows), dtype=bool, count=n)
+        self.sl_mult = np.fromiter((r[3] for r in self._rows), dtype=float, count=n)
+        self.tp_mult = np.full((n, width), np.nan)
+        for i, r in enumerate(self._rows):
+            self.tp_mult[i, :len(r[4])] = r[4]
+        self.winrate = np.fromiter((r[5] for r in self._rows), dtype=float, count=n)
+        self.direction_ok = np.fromiter((r[6] for r in self._rows), dtype=bool, count=n)
+        self.shadow = np.fromiter((r[7] for r in self._rows), dtype=bool, count=n)
+
+        def pair_col(key, dtype=float):
+            return np.array([p[key] for p in pairs], dtype=dtype)[self.pair_idx] if n else np.empty(0, dtype=dtype)
+
+        self.symbol = pair_col('symbol', object)
+        self.timeframe = pair_col('timeframe', object)
+        self.candle_count = pair_col('candle_count', np.int64)
+        self.momentum = np.trunc(pair_col('momentum'))
+        raw_entry = pair_col('entry')
+        self.atr = pair_col('atr')
+        self.built = ~np.isnan(self.atr) & (self.atr != 0)
+
+        # ATR-based SL/TP per strategy, rounded exactly like build_signal
+        direction = np.where(self.side_long, 1.0, -1.0)
+        sl = raw_entry - direction * self.atr * self.sl_mult
+        tp = raw_entry[:, None] + direction[:, None] * self.atr[:, None] * self.tp_mult
+        self.entry = np.round(raw_entry, 2)
+        self.sl = np.round(sl, 2)
+        self.tp = np.round(tp, 2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atr_ratio = self.atr / raw_entry
+        self.volatility = np.where(atr_ratio < 0.005, "LOW", np.where(atr_ratio > 0.02, "HIGH", "NORMAL"))
+
+        for key in TIMING_FIELDS:
+            setattr(self, key, pair_col(key))
+
+        self.market_direction = pair_col('market_direction', object)
+        self.features = {key: pair_col(key) for key in PAIR_FEATURES}
+        self.confidence = score_confidence(self.side_long, self.winrate, self.features)
+        self.opened_at = int(time.time())
+        return self
+
+    def top_k(self, mask, k):
+        """Indices of the k most confident rows in mask, highest first.
+
+        Uses partial selection instead of a full sort; ties keep insertion
+        order, matching a stable sort on confidence.
+        """
+        idx = np.flatnonzero(mask)
+        if k <= 0 or len(idx) == 0:
+            return idx[:0]
+        neg = -self.confidence[idx]
+        if len(idx) > k:
+            kth = np.partition(neg, k - 1)[k - 1]
+            keep = neg <= kth
+            idx, neg = idx[keep], neg[keep]
+        order = np.lexsort((idx, neg))
+        return idx[order][:k]
+
+    def journal_columns(self, reasons):
+        """Every row as journal columns - features plus what happened to it"""
+        return {
+            'evaluated_at': self.evaluated_at,
+            'candle_closed_at': self.candle_closed_at,
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'strategy': self.strategy,
+            'side': np.where(self.side_long, "LONG", "SHORT"),
+            'market_direction': self.market_direction,
+            'entry': self.entry,
+            'atr': self.atr,
+            'sl': self.sl,
+            'tp1': self.tp[:, 0],
+            'confidence': self.confidence,
+            'momentum': self.momentum,
+            'winrate': self.winrate,
+            'reason': reasons,
+            **self.features,
+        }
+
+    def to_signal(self, i, slno):
+        """Materialise a single row as the signal dict used by Telegram and the caches"""
+        tp = self.tp[i]
+        tp_mult = self.tp_mult[i]
+        momentum = int(self.momentum[i])
+        return {
+            'slno': slno,
+            'symbol': self.symbol[i],
+            'timeframe': self.timeframe[i],
+            'side': "LONG" if self.side_long[i] else "SHORT",
+            'entry': float(self.entry[i]),
+            'sl': float(self.sl[i]),
+            'sl_multiplier': float(self.sl_mult[i]),
+            'tp': [float(x) for x in tp[~np.isnan(tp)]],
+            'tp_multipliers': [float(x) for x in tp_mult[~np.isnan(tp_mult)]],
+            'atr_value': round(float(self.atr[i]), 6),
+            'volatility': str(self.volatility[i]),
+            'candle_count': int(self.candle_count[i]),
+            'strategy': self.strategy[i],
+            'opened_at': self.opened_at,
+            'entry_candle': int(self.candle_count[i]) - 1,
+            'confidence': float(self.confidence[i]),
+            'momentum': momentum,
+            'momentum_cat': momentum_category(momentum),
+            **{key: _timestamp(getattr(self, key)[i]) for key in TIMING_FIELDS},
+        }
+
+
+def _timestamp(value):
+    return None if np.isnan(value) else round(float(value), 3)
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import struct
+import time
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   MAGIC (8 bytes) | version u32 | header length u32 | header JSON | padding | array sections
+# The header lists every section's dtype, shape and byte offset; sections are
+# 64-byte aligned so each one is an aligned view straight into the mmap.
+MAGIC = b"CSBCKPT\0"
+VERSION = 1
+ALIGN = 64
+PREAMBLE = struct.Struct("<8sII")
+
+# Candle sections: <symbol>/<tf>/time -> int64 (n, 2), <symbol>/<tf>/values -> float64 (n, 6)
+TIME_FIELDS = ["open_time", "close_time"]
+VALUE_FIELDS = ["open", "high", "low", "close", "volume", "ATR"]
+SCHEMA = {"time": TIME_FIELDS, "values": VALUE_FIELDS, "state": ["trades", "strategy_history", "eval_state", "volume_stats"]}
+
+
+class CheckpointError(ValueError):
+    """Checkpoint file is unreadable, from another version or has a different schema"""
+
+
+def write_checkpoint(path, frames, state):
+    """Atomically write candle frames {(symbol, tf): df} plus JSON-able state to path"""
+    arrays = {}
+    for (symbol, tf), df in frames.items():
+        if df is None or not len(df):
+            continue
+        times = np.empty((len(df), len(TIME_FIELDS)), dtype="<i8")
+        times[:, 0] = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        times[:, 1] = np.asarray(df['close_time'], dtype=np.int64)
+        values = np.column_stack([
+            np.asarray(df[name], dtype=float) if name in df else np.full(len(df), np.nan)
+            for name in VALUE_FIELDS
+        ]).astype("<f8")
+        arrays[f"{symbol}/{tf}/time"] = times
+        arrays[f"{symbol}/{tf}/values"] = values
+
+    sections = {}
+    offset = 0
+    for name, arr in arrays.items():
+        sections[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _aligned(offset + arr.nbytes)
+    header = json.dumps({
+        "schema": SCHEMA,
+        "created_at": time.time(),
+        "sections": sections,
+        "state": state,
+    }).encode()
+    data_start = _aligned(PREAMBLE.size + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + sections[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """A loaded checkpoint: array sections are read-only views into one mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        if size < PREAMBLE.size:
+            raise CheckpointError(f"{path}: truncated")
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, header_len = PREAMBLE.unpack(self._map[:PREAMBLE.size].tobytes())
+        if magic != MAGIC:
+            raise CheckpointError(f"{path}: not a checkpoint")
+        if version != VERSION:
+            raise CheckpointError(f"{path}: version {version}, expected {VERSION}")
+        try:
+            header = json.loads(self._map[PREAMBLE.size:PREAMBLE.size + header_len].tobytes())
+        except ValueError as e:
+            raise CheckpointError(f"{path}: bad header ({e})")
+        if header.get("schema") != SCHEMA:
+            raise CheckpointError(f"{path}: schema mismatch")
+        self.created_at = header["created_at"]
+        self.state = header["state"]
+        self.sections = header["sections"]
+        self._data_start = _aligned(PREAMBLE.size + header_len)
+        for name, meta in self.sections.items():
+            end = self._data_start + meta["offset"] + np.dtype(meta["dtype"]).itemsize * int(np.prod(meta["shape"]))
+            if end > size:
+                raise CheckpointError(f"{path}: section {name} is truncated")
+
+    def array(self, name):
+        meta = self.sections[name]
+        return np.ndarray(tuple(meta["shape"]), dtype=meta["dtype"], buffer=self._map,
+                          offset=self._data_start + meta["offset"])
+
+    def pairs(self):
+        return [tuple(name.rsplit("/", 2)[:2]) for name in self.sections if name.endswith("/time")]
+
+    def frame(self, symbol, tf):
+        """Candles for one pair as a DataFrame shaped like fetch_klines + add_atr"""
+        times = self.array(f"{symbol}/{tf}/time")
+        values = self.array(f"{symbol}/{tf}/values")
+        df = pd.DataFrame(values, columns=VALUE_FIELDS)
+        df["close_time"] = times[:, 1]
+        df.index = pd.to_datetime(times[:, 0], unit="ms")
+        df.index.name = "open_time"
+        df = df[["open", "high", "low", "close", "volume", "close_time", "ATR"]]
+        df.attrs['fetched_at'] = self.created_at
+        return df
+
+    def frames(self):
+        return {(symbol, tf): self.frame(symbol, tf) for symbol, tf in self.pairs()}
+
+
+def load_checkpoint(path):
+    """Checkpoint at path, or None when it is missing or rejected (the run then starts cold)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return Checkpoint(path)
+    except (CheckpointError, OSError) as e:
+        logger.warning(f"Ignoring checkpoint: {e}")
+        return None
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
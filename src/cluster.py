@@ -0,0 +1,198 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Coordinator/worker protocol: newline-delimited JSON over TCP or a Unix socket.
+#   worker -> {"type": "hello", "worker": id}
+#   coord  -> {"type": "config", "winrates": {strategy: winrate}}
+#   worker -> {"type": "candidates", "rows": [signal dict without slno, ...]}
+#   worker -> {"type": "done", "stats": {...}}
+RING_REPLICAS = 64
+# Keys every candidate row needs for the merge and for the trade it may become
+ROW_KEYS = ("symbol", "timeframe", "strategy", "side", "confidence", "entry", "sl", "tp")
+MAX_MESSAGE = 16 * 1024 * 1024
+
+
+class HashRing:
+    """Consistent-hash ring: adding or removing a worker only moves ~1/n of the symbols"""
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def owner(self, key):
+        if not self._keys:
+            raise ValueError("Hash ring has no nodes")
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[i]
+
+    def shard(self, keys, node):
+        """The keys owned by node, in their original order"""
+        return [key for key in keys if self.owner(key) == node]
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+def parse_address(address):
+    """'tcp://host:port' or 'unix:///path/to.sock' -> ("tcp", (host, port)) / ("unix", path)"""
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Unsupported cluster address: {address}")
+
+
+async def open_connection(address):
+    kind, where = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(where, limit=MAX_MESSAGE)
+    return await asyncio.open_connection(*where, limit=MAX_MESSAGE)
+
+
+async def start_server(address, handler):
+    kind, where = parse_address(address)
+    if kind == "unix":
+        return await asyncio.start_unix_server(handler, where, limit=MAX_MESSAGE)
+    return await asyncio.start_server(handler, *where, limit=MAX_MESSAGE)
+
+
+async def send_message(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader):
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+
+class Coordinator:
+    """Collects candidate summaries from every worker for one run"""
+
+    def __init__(self, address, workers, winrates):
+        self.address = address
+        self.expected = set(workers)
+        self.winrates = winrates
+        self.rows = []
+        self.stats = {}
+        self._done = asyncio.Event()
+        self._server = None
+
+    async def start(self):
+        self._server = await start_server(self.address, self._handle)
+        logger.info(f"🛰️ Coordinator listening on {self.address} for {len(self.expected)} workers")
+
+    async def _handle(self, reader, writer):
+        worker = None
+        try:
+            hello = await read_message(reader)
+            if not isinstance(hello, dict) or hello.get("type") != "hello":
+                logger.warning(f"Dropping connection without a hello: {hello!r:.200}")
+                return
+            worker = hello.get("worker")
+            if worker not in self.expected:
+                logger.warning(f"Rejecting worker {worker!r}: not in CLUSTER_WORKERS {sorted(self.expected)}")
+                return
+            await send_message(writer, {"type": "config", "winrates": self.winrates})
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                kind = message.get("type") if isinstance(message, dict) else None
+                if kind == "candidates":
+                    rows = message.get("rows")
+                    if not isinstance(rows, list):
+                        logger.warning(f"Worker {worker} sent malformed candidate rows, skipped")
+                        continue
+                    valid = [row for row in rows if _valid_row(row)]
+                    if len(valid) < len(rows):
+                        logger.warning(f"Worker {worker}: dropped {len(rows) - len(valid)} candidate rows "
+                                       f"missing any of {ROW_KEYS}")
+                    for row in valid:
+                        row['worker'] = worker
+                    self.rows.extend(valid)
+                elif kind == "done":
+                    self.stats[worker] = message.get("stats") or {}
+                    break
+                else:
+                    logger.warning(f"Worker {worker} sent an unknown message, skipped: {message!r:.200}")
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Worker {worker} connection failed: {e}")
+        finally:
+            writer.close()
+            if self.expected <= set(self.stats):
+                self._done.set()
+
+    async def collect(self, timeout):
+        """Wait until every worker reported (or timeout) and return the candidate rows"""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            missing = sorted(self.expected - set(self.stats))
+            logger.warning(f"⏱️ No report from workers {missing} after {timeout}s")
+        self._server.close()
+        await self._server.wait_closed()
+        return self.rows
+
+
+def _valid_row(row):
+    return (isinstance(row, dict) and all(key in row for key in ROW_KEYS)
+            and isinstance(row['confidence'], (int, float)) and not isinstance(row['confidence'], bool))
+
+
+async def report_candidates(address, worker, evaluate, connect_timeout=30.0):
+    """Worker side: say hello, get the config, then stream what evaluate(config) found.
+
+    evaluate is awaited with the coordinator's config (strategy winrates) and
+    returns (rows, stats). Connecting retries until connect_timeout so workers
+    may start before the coordinator is listening.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            reader, writer = await open_connection(address)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+    try:
+        await send_message(writer, {"type": "hello", "worker": worker})
+        config = await read_message(reader) or {}
+        rows, stats = await evaluate(config)
+        for start in range(0, len(rows), 500):
+            await send_message(writer, {"type": "candidates", "rows": rows[start:start + 500]})
+        await send_message(writer, {"type": "done", "stats": stats})
+    finally:
+        writer.close()
+    return rows
+
+
+def merge_candidates(rows, is_duplicate, k):
+    """Global top-k by confidence over all workers' rows.
+
+    Rows seen twice (overlapping shards during a re-shard) count once, and
+    rows the coordinator already signalled recently are dropped.
+    """
+    seen = set()
+    unique = []
+    for row in rows:
+        key = (row['symbol'], row['timeframe'], row['strategy'], row['side'])
+        if key in seen or is_duplicate(row):
+            continue
+        seen.add(key)
+        unique.append(row)
+    # Stable sort: ties keep arrival order
+    unique.sort(key=lambda row: -row['confidence'])
+    return unique[:k]
+
@@ -1,37 +1,82 @@
-def calculate_confidence(signal, df, winrate):
-    """Calculate confidence score for scalping signals"""
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator
+
+
+def confidence_features(df, volume_stats=None, htf=None):
+    """Per-pair inputs for confidence scoring - computed once per DataFrame, shared by every strategy.
+
+    volume_stats (a VolumeStats) adds vol_pct, the latest volume's percentile
+    over days of history; without it vol_pct is NaN and scoring uses vol_ratio.
+    htf is MultiTimeframeView.features() for the pair (htf_trend, htf_regime).
+    """
+    htf = htf or {}
+    close = pd.Series(np.asarray(df['close'], dtype=float), copy=False)
+    volume = np.asarray(df['volume'], dtype=float)
+    open_ = np.asarray(df['open'], dtype=float)
+    atr = np.asarray(df['ATR'], dtype=float)
+
+    vol_mean = volume[-10:].mean() if len(volume) >= 10 else np.nan
+    last_close = close.iloc[-1]
+    return {
+        'vol_ratio': volume[-1] / vol_mean,
+        'vol_pct': volume_stats.percentile(volume[-1]) if volume_stats is not None else np.nan,
+        'body_pct': abs(last_close - open_[-1]) / open_[-1],
+        'atr_pct': (atr[-1] / last_close) * 100,
+        'rsi': RSIIndicator(close, window=14).rsi().iloc[-1],
+        'ema_fast': EMAIndicator(close, window=5).ema_indicator().iloc[-1],
+        'ema_slow': EMAIndicator(close, window=13).ema_indicator().iloc[-1],
+        'htf_trend': htf.get('htf_trend', np.nan),
+        'htf_regime': htf.get('htf_regime', np.nan),
+    }
+
+
+def score_confidence(long_side, winrate, feats):
+    """Vectorized confidence scoring for scalping signals.
+
+    long_side is a boolean array (True for LONG), winrate a float array and
+    feats a dict of arrays shaped like confidence_features() broadcast per row.
+    """
     score = 0.4 + (winrate - 0.5) * 0.4  # 0.2 to 0.6 based on winrate
-    
-    # Volume confirmation - crucial for scalping
-    vol_ratio = df['volume'].iloc[-1] / df['volume'].rolling(10).mean().iloc[-1]
-    if vol_ratio > 1.5: score += 0.15
-    elif vol_ratio > 1.2: score += 0.1
-    elif vol_ratio > 1.0: score += 0.05
-    
+
+    # Volume confirmation - crucial for scalping. Percentile of the long-run
+    # distribution when streaming stats are warm, else ratio to the 10-bar mean
+    vol_ratio = feats['vol_ratio']
+    vol_pct = feats.get('vol_pct', np.nan)
+    by_ratio = np.select([vol_ratio > 1.5, vol_ratio > 1.2, vol_ratio > 1.0], [0.15, 0.1, 0.05], 0.0)
+    by_pct = np.select([vol_pct >= 0.95, vol_pct >= 0.85, vol_pct >= 0.6], [0.15, 0.1, 0.05], 0.0)
+    score = score + np.where(np.isnan(vol_pct), by_ratio, by_pct)
+
     # Price action strength
-    price_change = abs(df['close'].iloc[-1] - df['open'].iloc[-1]) / df['open'].iloc[-1]
-    if price_change > 0.003: score += 0.1  # Strong candle
-    elif price_change > 0.001: score += 0.05
-    
+    body_pct = feats['body_pct']
+    score = score + np.select([body_pct > 0.003, body_pct > 0.001], [0.1, 0.05], 0.0)  # Strong candle
+
     # ATR: lower volatility = higher confidence for scalping
-    atr = df['ATR'].iloc[-1]
-    close = df['close'].iloc[-1]
-    atr_pct = (atr / close) * 100
-    if atr_pct < 1.0: score += 0.1
-    elif atr_pct < 1.5: score += 0.05
+    atr_pct = feats['atr_pct']
+    score = score + np.select([atr_pct < 1.0, atr_pct < 1.5], [0.1, 0.05], 0.0)
 
     # RSI alignment with signal direction
-    from ta.momentum import RSIIndicator
-    rsi = RSIIndicator(df['close'], window=14).rsi().iloc[-1]
-    if signal['side'] == 'LONG' and 25 <= rsi <= 55: score += 0.05  # Oversold to neutral
-    if signal['side'] == 'SHORT' and 45 <= rsi <= 75: score += 0.05  # Neutral to overbought
-    
+    rsi = feats['rsi']
+    score = score + np.where(long_side & (rsi >= 25) & (rsi <= 55), 0.05, 0.0)  # Oversold to neutral
+    score = score + np.where(~long_side & (rsi >= 45) & (rsi <= 75), 0.05, 0.0)  # Neutral to overbought
+
     # EMA trend alignment
-    from ta.trend import EMAIndicator
-    ema_fast = EMAIndicator(df['close'], window=5).ema_indicator().iloc[-1]
-    ema_slow = EMAIndicator(df['close'], window=13).ema_indicator().iloc[-1]
-    
-    if signal['side'] == 'LONG' and ema_fast > ema_slow: score += 0.05
-    if signal['side'] == 'SHORT' and ema_fast < ema_slow: score += 0.05
-
-    return min(max(score, 0), 1.0)
\ No newline at end of file
+    ema_fast, ema_slow = feats['ema_fast'], feats['ema_slow']
+    score = score + np.where(long_side & (ema_fast > ema_slow), 0.05, 0.0)
+    score = score + np.where(~long_side & (ema_fast < ema_slow), 0.05, 0.0)
+
+    # Higher timeframe: trend agrees with the signal, volatility regime not HIGH
+    htf_trend = feats.get('htf_trend', np.nan)
+    score = score + np.where(long_side & (htf_trend > 0), 0.05, 0.0)
+    score = score + np.where(~long_side & (htf_trend < 0), 0.05, 0.0)
+    score = score - np.where(feats.get('htf_regime', np.nan) == 2, 0.05, 0.0)
+
+    return np.clip(score, 0, 1.0)
+
+
+def calculate_confidence(signal, df, winrate, volume_stats=None, htf=None):
+    """Calculate confidence score for scalping signals"""
+    feats = {k: np.array([v], dtype=float) for k, v in confidence_features(df, volume_stats, htf).items()}
+    long_side = np.array([signal['side'] == 'LONG'])
+    return float(score_confidence(long_side, np.array([winrate], dtype=float), feats)[0])
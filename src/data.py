@@ -1,37 +1,83 @@
 import httpx
+import os
 import pandas as pd
 import numpy as np
 import time
 import logging
 from ta.volatility import AverageTrueRange
+from src.hedging import HOST_STATS, HEDGE_BUDGET, hedged_call, hedge_pool
 
 logger = logging.getLogger(__name__)
 
 BINANCE_BASE = "https://api.binance.com/api/v3/klines"
-TF_MAP = {"3m": "3m", "5m": "5m", "15m": "15m"}
+TF_MAP = {"3m": "3m", "5m": "5m", "15m": "15m", "1h": "1h"}
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "qav", "trades", "taker_base_vol", "taker_quote_vol", "ignore"
+]
+# Binance mirrors, in the order the sequential fetch tries them
+API_HOSTS = [
+    "api.binance.com",
+    "api1.binance.com",
+    "api2.binance.com",
+    "api3.binance.com",
+    "data-api.binance.vision",
+]
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+# Hedged mode: race a second mirror when the first is slower than its recent p95
+HEDGED_FETCH = os.getenv("HEDGED_FETCH", "0") == "1"
 
-def fetch_klines(symbol, interval, limit=200):
+def klines_frame(data):
+    """Raw Binance kline rows -> DataFrame indexed by open_time"""
+    df = pd.DataFrame(data, columns=KLINE_COLUMNS)
+    df = df.astype({
+        "open": float, "high": float, "low": float, "close": float, "volume": float
+    })
+    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
+    df.set_index("open_time", inplace=True)
+    df.attrs['fetched_at'] = time.time()  # For candle-close -> alert latency
+    return df
+
+def fetch_klines(symbol, interval, limit=200, start_time=None, end_time=None, min_candles=50, hedged=None,
+                 on_request=None):
+    """Fetch klines as a DataFrame indexed by open_time.
+
+    start_time/end_time (ms) select a historical page; min_candles=0 accepts
+    short or empty pages (e.g. before a symbol was listed). hedged overrides
+    the HEDGED_FETCH setting for this call. on_request() is called before
+    every HTTP attempt, retries and hedges included - e.g. a rate limiter's
+    acquire.
+    """
+    query = f"symbol={symbol}&interval={interval}&limit={limit}"
+    if start_time is not None:
+        query += f"&startTime={int(start_time)}"
+    if end_time is not None:
+        query += f"&endTime={int(end_time)}"
+    if HEDGED_FETCH if hedged is None else hedged:
+        return fetch_klines_hedged(symbol, query, min_candles, on_request)
     # Try multiple APIs and backup sources
-    apis = [
-        f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}",
-        f"https://api1.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}",
-        f"https://api2.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}",
-        f"https://api3.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}",
-        f"https://data-api.binance.vision/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}",
-    ]
+    apis = [f"https://{host}/api/v3/klines?{query}" for host in API_HOSTS]
     
     for i, url in enumerate(apis):
         # Retry each API up to 3 times
         for retry in range(3):
+            started = None
             try:
                 retry_suffix = f" (retry {retry+1})" if retry > 0 else ""
-                logger.info(f"  📡 Trying API {i+1}{retry_suffix}: {url.split('//')[1].split('/')[0]}")
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'application/json',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                }
-                r = httpx.get(url, timeout=15, headers=headers)
+                logger.info(f"  📡 Trying API {i+1}{retry_suffix}: {API_HOSTS[i]}")
+                if on_request:
+                    on_request()
+                started = time.monotonic()
+                r = httpx.get(url, timeout=15, headers=HEADERS)
+                HOST_STATS.record(API_HOSTS[i], time.monotonic() - started, ok=r.status_code == 200)
             
                 if r.status_code == 451:
                     logger.warning(f"  ❌ API {i+1}: Geo-blocked (451)")
@@ -45,6 +91,8 @@ def fetch_klines(symbol, interval, limit=200):
                         break
                     
                 data = r.json()
+                if not data and min_candles == 0:
+                    return pd.DataFrame(columns=KLINE_COLUMNS).set_index("open_time")
                 if not data or len(data) == 0:
                     logger.warning(f"  ❌ API {i+1}: Empty response")
                     if retry < 2:
@@ -54,7 +102,7 @@ def fetch_klines(symbol, interval, limit=200):
                         break
                     
                 # Validate data quality
-                if len(data) < 50:
+                if len(data) < min_candles:
                     logger.warning(f"  ❌ API {i+1}: Insufficient data ({len(data)} candles)")
                     if retry < 2:
                         time.sleep(1)
@@ -64,15 +112,7 @@ def fetch_klines(symbol, interval, limit=200):
                     
                 logger.info(f"  ✅ API {i+1}: Success - {len(data)} candles")
                 
-                df = pd.DataFrame(data, columns=[
-                    "open_time", "open", "high", "low", "close", "volume",
-                    "close_time", "qav", "trades", "taker_base_vol", "taker_quote_vol", "ignore"
-                ])
-                df = df.astype({
-                    "open": float, "high": float, "low": float, "close": float, "volume": float
-                })
-                df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-                df.set_index("open_time", inplace=True)
+                df = klines_frame(data)
                 
                 # Additional data validation
                 if df['close'].isna().any() or df['volume'].isna().any():
@@ -86,6 +126,9 @@ def fetch_klines(symbol, interval, limit=200):
                 return df
                 
             except Exception as e:
+                # Timeouts and connection errors: penalise the host in the hedging ranking too
+                if started is not None:
+                    HOST_STATS.record(API_HOSTS[i], time.monotonic() - started, ok=False)
                 logger.error(f"  ❌ API {i+1}: Exception - {str(e)}")
                 if retry < 2:
                     time.sleep(2)  # Wait longer before retry on exception
@@ -96,22 +139,111 @@ def fetch_klines(symbol, interval, limit=200):
     print(f"  🚨 CRITICAL: All APIs failed for {symbol}")
     return None
 
-def fetch_all_data(symbols, timeframes):
+def fetch_klines_hedged(symbol, query, min_candles=50, on_request=None):
+    """Hedged fetch: ask the best mirror, race the next-best if it is slow, keep the first valid answer"""
+    def request(host):
+        if on_request:
+            on_request()
+        r = httpx.get(f"https://{host}/api/v3/klines?{query}", timeout=15, headers=HEADERS)
+        if r.status_code != 200:
+            raise ValueError(f"HTTP {r.status_code}")
+        data = r.json()
+        if not data and min_candles == 0:
+            return pd.DataFrame(columns=KLINE_COLUMNS).set_index("open_time")
+        if not data or len(data) < min_candles:
+            raise ValueError(f"Insufficient data ({len(data) if data else 0} candles)")
+        df = klines_frame(data)
+        if df['close'].isna().any() or df['volume'].isna().any():
+            raise ValueError("Data contains NaN values")
+        return df
+
+    host, df = hedged_call(API_HOSTS, request, HOST_STATS, HEDGE_BUDGET, hedge_pool())
+    if df is None:
+        print(f"  🚨 CRITICAL: All APIs failed for {symbol}")
+        return None
+    logger.info(f"  ✅ {host}: Success - {len(df)} candles (hedged, {HEDGE_BUDGET.hedges}/{HEDGE_BUDGET.primaries} hedges)")
+    return df
+
+def fetch_all_data(symbols, timeframes, warm=None, limit=200, pairs=None, deadline=None):
+    """Fetch every (symbol, tf) with ATR. warm holds candles from a checkpoint;
+    pairs found there only fetch the candles that closed since.
+
+    pairs restricts the fetch to those (symbol, tf) in that order. Pairs not
+    started by deadline (epoch seconds) are left out of the result.
+    """
+    warm = warm or {}
+    if pairs is None:
+        pairs = [(symbol, tf) for symbol in symbols for tf in timeframes]
     data = {}
-    for symbol in symbols:
-        for tf in timeframes:
-            print(f"📊 Fetching {symbol} {tf}...")
-            df = fetch_klines(symbol, TF_MAP[tf])
+    for n, (symbol, tf) in enumerate(pairs):
+        if deadline is not None and time.time() > deadline:
+            print(f"⏱️ Run time budget reached, {len(pairs) - n} pairs left for the next run")
+            break
+        print(f"📊 Fetching {symbol} {tf}...")
+        cached = warm.get((symbol, tf))
+        df = fetch_warm(symbol, tf, cached, limit) if cached is not None and len(cached) else None
+        if df is None:
+            df = fetch_klines(symbol, TF_MAP[tf], limit=limit)
             if df is not None:
                 df = add_atr(df)
-                data[(symbol, tf)] = df
-                print(f"  ✅ {symbol} {tf}: {len(df)} candles")
-            else:
-                print(f"  ❌ {symbol} {tf}: Failed")
-                data[(symbol, tf)] = None
+        if df is not None:
+            data[(symbol, tf)] = df
+            print(f"  ✅ {symbol} {tf}: {len(df)} candles")
+        else:
+            print(f"  ❌ {symbol} {tf}: Failed")
+            data[(symbol, tf)] = None
     return data
 
-def add_atr(df, period=14):
+def fetch_warm(symbol, tf, cached, limit=200):
+    """Top up cached candles with the ones since its last (possibly unfinished) candle.
+
+    Returns None when the gap is too wide or the fetch fails, so the caller
+    falls back to a full fetch.
+    """
+    last_open = last_open_time(cached)
+    needed = (time.time() * 1000 - last_open) // INTERVAL_MS[tf] + 2
+    if needed > limit or np.isnan(cached['ATR'].iloc[-1]):
+        return None
+    fresh = fetch_klines(symbol, TF_MAP[tf], limit=int(needed), start_time=last_open, min_candles=0)
+    if fresh is None or not len(fresh):
+        return None
+    keep = cached[cached.index < fresh.index[0]]
+    fresh = fresh[["open", "high", "low", "close", "volume", "close_time"]].copy()
+    fresh["ATR"] = np.nan
+    df = pd.concat([keep, fresh]).iloc[-limit:]
+    df.attrs['fetched_at'] = fresh.attrs.get('fetched_at', time.time())
+    return extend_atr(df, len(df) - len(fresh))
+
+def extend_atr(df, start, period=14):
+    """Continue Wilder's ATR (as ta computes it) from row start-1 over the rows after it"""
+    if start < 1 or np.isnan(df['ATR'].iloc[start - 1]):
+        return add_atr(df)
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    close = df['close'].to_numpy()
+    atr = df['ATR'].to_numpy(dtype=float, copy=True)
+    for i in range(start, len(df)):
+        tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        atr[i] = (atr[i - 1] * (period - 1) + tr) / period
+    df['ATR'] = atr
+    return df
+
+def closed_candles(df, now=None):
+    """Drop the still-forming last candle Binance returns, keeping only closed bars"""
+    if df is None or not len(df):
+        return df
+    now_ms = (now or time.time()) * 1000
+    if int(df['close_time'].iloc[-1]) >= now_ms:
+        return df.iloc[:-1]
+    return df
+
+def last_open_time(df):
+    """open_time of the last row in ms"""
+    return int(df.index[-1].value // 1_000_000)
+
+ATR_PERIOD = 14
+
+def add_atr(df, period=ATR_PERIOD):
     try:
         atr = AverageTrueRange(df['high'], df['low'], df['close'], window=period).average_true_range()
         df['ATR'] = atr
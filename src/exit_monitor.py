@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.data import fetch_klines
+
+EXIT_INTERVAL = "1m"
+EXIT_INTERVAL_MS = 60_000
+MAX_WINDOW = 1000          # Binance max candles per request
+MAX_HOLD_SECONDS = 300     # Same 5 minute scalp hold as check_trade_exit
+MIN_PROFIT_ATR = 0.3
+
+
+def fetch_exit_windows(trades, now=None, workers=4):
+    """One 1m window per symbol, starting at that symbol's oldest open trade.
+
+    All symbols are fetched concurrently; returns {symbol: DataFrame}.
+    """
+    now_ms = int((now or time.time()) * 1000)
+    oldest = {}
+    for trade in trades:
+        opened_ms = int(trade.get('opened_at', 0) * 1000)
+        oldest[trade['symbol']] = min(oldest.get(trade['symbol'], opened_ms), opened_ms)
+
+    def fetch(symbol):
+        start_ms = (oldest[symbol] // EXIT_INTERVAL_MS) * EXIT_INTERVAL_MS
+        needed = (now_ms - start_ms) // EXIT_INTERVAL_MS + 1
+        if needed > MAX_WINDOW:
+            # Older than one page: the latest MAX_WINDOW minutes still settle most trades
+            return fetch_klines(symbol, EXIT_INTERVAL, limit=MAX_WINDOW, min_candles=0)
+        return fetch_klines(symbol, EXIT_INTERVAL, limit=int(needed), start_time=start_ms, min_candles=0)
+
+    symbols = sorted(oldest)
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(symbols))) as pool:
+        frames = dict(zip(symbols, pool.map(fetch, symbols)))
+    return {symbol: df for symbol, df in frames.items() if df is not None and len(df)}
+
+
+def resolve_trade(trade, df, now=None):
+    """Walk 1m candles since the trade opened and report the first exit.
+
+    Uses each candle's high/low, so touches between runs are caught; the
+    candle the trade opened in counts with its close only. When SL
+    and TP fall inside the same candle the SL is assumed to have hit first.
+    Returns the same shape as check_trade_exit.
+    """
+    now = now or time.time()
+    side = trade['side']
+    entry, sl, tp = trade['entry'], trade['sl'], trade['tp']
+    atr = trade.get('atr_value', 0) or 0
+    opened_ms = trade.get('opened_at', now) * 1000
+
+    close_time = df['close_time'].to_numpy().astype(np.int64)
+    # From the candle the trade opened in; of that one only its close is known to follow the entry
+    after = close_time >= opened_ms
+    if not after.any():
+        return {'closed': False}
+    close_time = close_time[after]
+    close = df['close'].to_numpy(dtype=float)[after]
+    high = df['high'].to_numpy(dtype=float)[after]
+    low = df['low'].to_numpy(dtype=float)[after]
+    open_time = df.index.values.astype("datetime64[ms]").astype(np.int64)[after]
+    if open_time[0] < opened_ms:
+        high[0] = low[0] = close[0]
+
+    if side == 'LONG':
+        sl_hit = low <= sl
+        tp_hits = [high >= t for t in tp]
+        time_profit = close >= entry + atr * MIN_PROFIT_ATR
+    else:
+        sl_hit = high >= sl
+        tp_hits = [low <= t for t in tp]
+        time_profit = close <= entry - atr * MIN_PROFIT_ATR
+    # The live candle's close is the current price, as of now rather than its close_time
+    seen_at = np.minimum((close_time + 1) / 1000, now)
+    time_profit &= seen_at - trade.get('opened_at', now) >= MAX_HOLD_SECONDS
+
+    first = lambda mask: int(np.argmax(mask)) if mask.any() else len(mask)
+    bar_sl = first(sl_hit)
+    bar_tp = [first(m) for m in tp_hits]
+    bar_time = first(time_profit)
+    bar_first_tp = min(bar_tp) if bar_tp else len(high)
+
+    if bar_sl < len(high) and bar_sl <= bar_first_tp and bar_sl <= bar_time:
+        return {'closed': True, 'reason': 'SL Hit', 'exit_price': sl, 'exit_candle_close': int(close_time[bar_sl])}
+    if bar_first_tp < len(high) and bar_first_tp <= bar_time:
+        i = bar_tp.index(bar_first_tp)
+        return {'closed': True, 'reason': f'TP{i+1} Hit', 'exit_price': tp[i], 'exit_candle_close': int(close_time[bar_first_tp])}
+    if bar_time < len(high):
+        return {'closed': True, 'reason': 'Time Exit with Profit', 'exit_price': float(close[bar_time]),
+                'exit_candle_close': int(close_time[bar_time])}
+    return {'closed': False}
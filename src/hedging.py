@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+# Defaults for hedged requests
+MIN_SAMPLES = 5           # Latency samples needed before trusting a host's p95
+DEFAULT_DELAY = 1.0       # Hedge delay (s) for hosts we know nothing about
+MIN_DELAY = 0.05
+MAX_DELAY = 5.0
+FAILURE_PENALTY = 10.0    # Seconds added to a host's rank per recent failure
+
+
+class HostStats:
+    """Rolling per-host latency and failure history, shared by all fetches"""
+
+    def __init__(self, window=50):
+        self.window = window
+        self.latency = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def record(self, host, seconds, ok):
+        with self.lock:
+            # Fast failures (e.g. geo-blocks) must not make a host look quick,
+            # but one that hung until a timeout counts as that slow
+            if ok or seconds >= MAX_DELAY:
+                self.latency.setdefault(host, deque(maxlen=self.window)).append(seconds)
+            fails = self.failures.setdefault(host, deque(maxlen=self.window))
+            fails.append(0 if ok else 1)
+
+    def quantile(self, host, q):
+        with self.lock:
+            samples = list(self.latency.get(host, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return float(np.quantile(samples, q))
+
+    def hedge_delay(self, host):
+        """How long to wait on host before asking another mirror - its recent p95"""
+        p95 = self.quantile(host, 0.95)
+        if p95 is None:
+            return DEFAULT_DELAY
+        return min(max(p95, MIN_DELAY), MAX_DELAY)
+
+    def rank(self, hosts):
+        """Hosts ordered best-first by median latency plus a penalty for recent failures"""
+        def score(item):
+            i, host = item
+            p50 = self.quantile(host, 0.5)
+            with self.lock:
+                recent_failures = sum(list(self.failures.get(host, ()))[-10:])
+            # Unmeasured hosts score as DEFAULT_DELAY and keep their configured order
+            return ((p50 if p50 is not None else DEFAULT_DELAY) + recent_failures * FAILURE_PENALTY, i)
+        return [host for _, host in sorted(enumerate(hosts), key=score)]
+
+
+class HedgeBudget:
+    """Caps hedges to a fraction of primary requests (token bucket with a small burst)"""
+
+    def __init__(self, ratio=0.1, burst=3):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+        self.lock = threading.Lock()
+        self.primaries = 0
+        self.hedges = 0
+
+    def on_primary(self):
+        with self.lock:
+            self.primaries += 1
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_hedge(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.hedges += 1
+                return True
+            return False
+
+
+def hedged_call(hosts, request, stats, budget, pool):
+    """Run request(host) against the best host, hedging to the next-best mirror
+    when it is slower than its own recent p95. Returns (host, result) for the
+    first valid answer, or (None, None) when every host failed.
+
+    request(host) must return a result or raise. Losing requests that already
+    started are abandoned: their results are discarded once they finish.
+    """
+    ranked = stats.rank(hosts)
+    pending = {}
+    next_host = 0
+
+    def launch():
+        nonlocal next_host
+        host = ranked[next_host]
+        next_host += 1
+        pending[pool.submit(_timed, request, host, stats)] = host
+
+    budget.on_primary()
+    launch()
+    try:
+        while pending:
+            # Hedge once the latest host is slower than its own recent p95
+            can_hedge = next_host < len(ranked)
+            timeout = stats.hedge_delay(ranked[next_host - 1]) if can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if budget.try_hedge():
+                    launch()
+                else:
+                    # Out of hedge budget - just wait for what is in flight
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                host = pending.pop(future)
+                try:
+                    return host, future.result()
+                except Exception:
+                    # Failed outright: start the next host now rather than after another
+                    # hedge delay. With nothing else in flight that is a plain failover;
+                    # alongside a pending request it is a hedge and spends budget
+                    if next_host < len(ranked) and (not pending or budget.try_hedge()):
+                        launch()
+        return None, None
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _timed(request, host, stats):
+    started = time.monotonic()
+    try:
+        result = request(host)
+    except Exception:
+        stats.record(host, time.monotonic() - started, ok=False)
+        raise
+    stats.record(host, time.monotonic() - started, ok=True)
+    return result
+
+
+HOST_STATS = HostStats()
+HEDGE_BUDGET = HedgeBudget()
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def hedge_pool(workers=8):
+    """Shared worker pool for hedged requests (created on first use)"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        return _POOL
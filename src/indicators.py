@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator, MACD
+
+# Indicator registry used by the strategy compiler.
+# Each entry computes the full-history array from the candle columns and may
+# provide a cheaper "last bar only" path. Cost is a rough relative CPU weight
+# used to order conditions so cheap checks short-circuit expensive ones.
+
+
+def _series(cols, name):
+    return pd.Series(np.asarray(cols[name], dtype=float), copy=False)
+
+
+def _lagged(cols, name, lag=0):
+    values = np.asarray(cols[name], dtype=float)
+    if lag == 0:
+        return values
+    out = np.full(len(values), np.nan)
+    out[lag:] = values[:-lag]
+    return out
+
+
+def _lagged_last(cols, name, lag=0):
+    values = np.asarray(cols[name], dtype=float)
+    return float(values[-1 - lag]) if len(values) > lag else np.nan
+
+
+def price(field):
+    """Raw candle column, optionally lagged: ("close", 1) is the previous close"""
+    return {
+        "full": lambda cols, lag=0: _lagged(cols, field, lag),
+        "last": lambda cols, lag=0: _lagged_last(cols, field, lag),
+        "cost": 1,
+    }
+
+
+def ema(cols, window):
+    return EMAIndicator(_series(cols, 'close'), window=window).ema_indicator().to_numpy()
+
+
+def rsi(cols, window):
+    return RSIIndicator(_series(cols, 'close'), window=window).rsi().to_numpy()
+
+
+def macd_diff(cols, fast=12, slow=26, signal=9):
+    return MACD(_series(cols, 'close'), window_fast=fast, window_slow=slow, window_sign=signal).macd_diff().to_numpy()
+
+
+def volume_sma(cols, window):
+    return _series(cols, 'volume').rolling(window).mean().to_numpy()
+
+
+def volume_sma_last(cols, window):
+    volume = np.asarray(cols['volume'], dtype=float)
+    return volume[-window:].sum() / window if len(volume) >= window else np.nan
+
+
+def vwap(cols, period=20):
+    """Rolling VWAP over the last `period` candles (whole window while shorter)"""
+    close = _series(cols, 'close')
+    volume = _series(cols, 'volume')
+    pv = (close * volume).rolling(period, min_periods=1).sum()
+    vol = volume.rolling(period, min_periods=1).sum()
+    return np.where(vol != 0, pv / vol.where(vol != 0, 1.0), close).astype(float)
+
+
+def vwap_last(cols, period=20):
+    close = np.asarray(cols['close'], dtype=float)[-period:]
+    volume = np.asarray(cols['volume'], dtype=float)[-period:]
+    vol = volume.sum()
+    return (close * volume).sum() / vol if vol != 0 else close[-1]
+
+def context_full(cols):
+    return np.full(len(cols['close']), np.nan)
+
+
+def context_last(cols):
+    return np.nan
+
+
+# Per-symbol context the caller supplies through the shared values cache
+# (higher-timeframe trend/regime from src.mtf). Without it they are NaN and
+# any condition on them fails.
+def context():
+    return {"full": context_full, "last": context_last, "cost": 1}
+
+
+INDICATORS = {
+    "open": price('open'),
+    "high": price('high'),
+    "low": price('low'),
+    "close": price('close'),
+    "volume": price('volume'),
+    "ema": {"full": ema, "cost": 10},
+    "rsi": {"full": rsi, "cost": 15},
+    "macd_diff": {"full": macd_diff, "cost": 30},
+    "volume_sma": {"full": volume_sma, "last": volume_sma_last, "cost": 3},
+    "vwap": {"full": vwap, "last": vwap_last, "cost": 4},
+    "htf_trend": context(),
+    "htf_regime": context(),
+}
@@ -0,0 +1,173 @@
+import glob
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# Every candidate the strategies produced, with its features and what
+# happened to it. reason is "sent" for delivered signals, otherwise the
+# first check that rejected it (see validation.rejection_reasons).
+JOURNAL_COLUMNS = {
+    "evaluated_at": np.float64,
+    "candle_closed_at": np.float64,
+    "symbol": str,
+    "timeframe": str,
+    "strategy": str,
+    "side": str,
+    "market_direction": str,
+    "entry": np.float64,
+    "atr": np.float64,
+    "sl": np.float64,
+    "tp1": np.float64,
+    "confidence": np.float64,
+    "momentum": np.float64,
+    "vol_ratio": np.float64,
+    "vol_pct": np.float64,
+    "body_pct": np.float64,
+    "atr_pct": np.float64,
+    "rsi": np.float64,
+    "ema_fast": np.float64,
+    "ema_slow": np.float64,
+    "htf_trend": np.float64,
+    "htf_regime": np.float64,
+    "winrate": np.float64,
+    "reason": str,
+}
+
+
+class SignalJournal:
+    """Append-only journal of evaluated candidates, written off the hot path.
+
+    Callers hand over whole column batches (or single records); a background
+    thread buffers them and writes compressed .npz segments of up to
+    segment_rows rows. A segment that is not full yet is rewritten on each
+    flush - also by the next process, which picks it up on open - so short
+    runs fill segments instead of leaving one small file each. Only the
+    newest max_segments files are kept.
+    """
+
+    def __init__(self, directory, segment_rows=20_000, flush_seconds=5.0, max_segments=500):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_seconds = flush_seconds
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        existing = _segment_paths(directory)
+        self.next_seq = _segment_seq(existing[-1]) + 1 if existing else 0
+        self.queue = queue.SimpleQueue()
+        self.buffer = {name: [] for name in JOURNAL_COLUMNS}
+        self.buffered = 0
+        self.pending = 0  # Rows in the buffer not written to any segment yet
+        if existing:
+            # Keep filling the last segment if an earlier run left it short
+            tail = load_journal(directory, first=self.next_seq - 1, last=self.next_seq - 1)
+            rows = len(tail["symbol"])
+            if rows < segment_rows:
+                self.next_seq -= 1
+                self.buffer = {name: [values] for name, values in tail.items()}
+                self.buffered = rows
+        self.thread = threading.Thread(target=self._run, name="signal-journal", daemon=True)
+        self.thread.start()
+
+    def extend(self, columns):
+        """Queue a batch: dict of equal-length arrays/lists keyed by JOURNAL_COLUMNS"""
+        self.queue.put(columns)
+
+    def append(self, record):
+        """Queue a single candidate record (dict)"""
+        self.queue.put({name: [record.get(name)] for name in JOURNAL_COLUMNS})
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                batch = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                batch = False
+            if batch is None:
+                self._flush()
+                return
+            if batch:
+                n = len(batch["symbol"])
+                for name in JOURNAL_COLUMNS:
+                    values = batch.get(name)
+                    self.buffer[name].append(values if values is not None else [None] * n)
+                self.buffered += n
+                self.pending += n
+            if self.buffered >= self.segment_rows or (self.pending and time.monotonic() - last_flush >= self.flush_seconds):
+                self._flush()
+                last_flush = time.monotonic()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        columns = {}
+        for name, dtype in JOURNAL_COLUMNS.items():
+            if dtype is str:
+                values = ["" if v is None else str(v) for part in self.buffer[name] for v in part]
+                columns[name] = np.array(values, dtype=str)
+            else:
+                columns[name] = np.concatenate([np.asarray(part, dtype=dtype) for part in self.buffer[name]])
+        path = os.path.join(self.directory, f"segment-{self.next_seq:08d}.npz")
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, **columns)
+        os.replace(tmp, path)
+        self.pending = 0
+        if self.buffered >= self.segment_rows:
+            self.next_seq += 1
+            self.buffer = {name: [] for name in JOURNAL_COLUMNS}
+            self.buffered = 0
+        else:
+            # Still short: the next flush rewrites this segment with more rows
+            self.buffer = {name: [values] for name, values in columns.items()}
+        self._rotate()
+
+    def _rotate(self):
+        segments = _segment_paths(self.directory)
+        for path in segments[:max(len(segments) - self.max_segments, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _segment_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "segment-*[0-9].npz")))
+
+
+def _segment_seq(path):
+    return int(os.path.basename(path)[len("segment-"):-len(".npz")])
+
+
+def list_segments(directory):
+    """Sequence numbers of the segments currently on disk"""
+    return [_segment_seq(p) for p in _segment_paths(directory)]
+
+
+def load_journal(directory, first=None, last=None, columns=None):
+    """Load segments first..last (inclusive sequence numbers) into one dict of arrays"""
+    columns = columns or list(JOURNAL_COLUMNS)
+    parts = {name: [] for name in columns}
+    for path in _segment_paths(directory):
+        seq = _segment_seq(path)
+        if (first is not None and seq < first) or (last is not None and seq > last):
+            continue
+        with np.load(path) as segment:
+            rows = len(segment["symbol"])
+            for name in columns:
+                if name in segment.files:
+                    parts[name].append(segment[name])
+                else:
+                    # Column added after this segment was written
+                    dtype = JOURNAL_COLUMNS[name]
+                    parts[name].append(np.full(rows, "" if dtype is str else np.nan, dtype=dtype))
+    return {
+        name: np.concatenate(values) if values else np.empty(0, dtype=JOURNAL_COLUMNS[name])
+        for name, values in parts.items()
+    }
@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+from src.cache import safe_load_json
+from src.data import INTERVAL_MS
+
+# Pipeline stages, measured in seconds:
+#   fetch    - candle close -> market data fetched
+#   evaluate - fetched -> strategies/confidence done
+#   deliver  - evaluated -> Telegram accepted the message
+#   total    - candle close -> Telegram accepted the message
+QUANTILES = [0.5, 0.95, 0.99]
+
+# Health thresholds for the run summary. Signals come from the last closed
+# candle, which can be up to one interval old when the run starts, so the
+# p95 limit is one interval of the timeframe plus this slack
+MAX_P95_TOTAL_SECONDS = float(os.getenv("LATENCY_P95_LIMIT", "120"))
+MAX_SUMMARY_AGE_SECONDS = 2 * 3600
+# Deferring some due pairs is the scheduler working as designed; it becomes a
+# problem when most due pairs are deferred or deferral lasts this many runs
+MAX_DEFERRED_SHARE = 0.5
+MAX_DEFERRED_RUNS = 3
+
+
+def stamp_latency(event, delivered_at=None):
+    """Per-stage latencies for a signal or trade close carrying our timestamps"""
+    closed = event.get('candle_closed_at')
+    fetched = event.get('fetched_at')
+    evaluated = event.get('evaluated_at')
+    delivered = delivered_at or event.get('delivered_at')
+    out = {}
+    if closed is not None and fetched is not None:
+        out['fetch'] = fetched - closed
+    if fetched is not None and evaluated is not None:
+        out['evaluate'] = evaluated - fetched
+    if evaluated is not None and delivered is not None:
+        out['deliver'] = delivered - evaluated
+    if closed is not None and delivered is not None:
+        out['total'] = delivered - closed
+    return out
+
+
+class LatencyTracker:
+    """Rolling latency samples per (kind, timeframe, stage), persisted between runs"""
+
+    def __init__(self, path, max_samples=500):
+        self.path = path
+        self.samples = safe_load_json(self.path, {})
+        self.max_samples = max_samples
+
+    def record(self, kind, timeframe, event):
+        """Record the stage latencies of one delivered signal or trade close"""
+        for stage, value in stamp_latency(event).items():
+            bucket = self.samples.setdefault(f"{kind}|{timeframe}|{stage}", [])
+            bucket.append(round(value, 3))
+            if len(bucket) > self.max_samples:
+                del bucket[:-self.max_samples]
+
+    def percentiles(self):
+        """{(kind, timeframe, stage): {"count", "sum", 0.5, 0.95, 0.99}}"""
+        out = {}
+        for key, values in self.samples.items():
+            if not values:
+                continue
+            arr = np.asarray(values, dtype=float)
+            stats = {"count": len(arr), "sum": float(arr.sum())}
+            for q, v in zip(QUANTILES, np.quantile(arr, QUANTILES)):
+                stats[q] = float(v)
+            out[tuple(key.split("|"))] = stats
+        return out
+
+    def export_openmetrics(self, path):
+        """Write the rolling percentiles as an OpenMetrics text file (atomic replace)"""
+        lines = [
+            "# TYPE csb_latency_seconds summary",
+            "# UNIT csb_latency_seconds seconds",
+            "# HELP csb_latency_seconds Candle close to Telegram delivery latency by stage (rolling window).",
+        ]
+        for (kind, tf, stage), stats in sorted(self.percentiles().items()):
+            labels = f'kind="{kind}",timeframe="{tf}",stage="{stage}"'
+            for q in QUANTILES:
+                lines.append(f'csb_latency_seconds{{{labels},quantile="{q}"}} {stats[q]:.3f}')
+            lines.append(f'csb_latency_seconds_sum{{{labels}}} {stats["sum"]:.3f}')
+            lines.append(f'csb_latency_seconds_count{{{labels}}} {stats["count"]}')
+        lines.append("# EOF")
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.samples, f)
+
+
+def write_run_summary(path, run, tracker):
+    """Compact summary of one run, including health verdict, for CI and health checks"""
+    latency = {}
+    for (kind, tf, stage), stats in tracker.percentiles().items():
+        if stage == "total":
+            latency[f"{kind}_{tf}"] = {f"p{int(q * 100)}": round(stats[q], 3) for q in QUANTILES}
+    summary = dict(run)
+    # Consecutive runs that deferred due pairs, carried over from the last summary
+    summary['deferred_runs'] = 0
+    if summary.get('pairs_deferred', 0):
+        summary['deferred_runs'] = safe_load_json(path, {}).get('deferred_runs', 0) + 1
+    summary['latency'] = latency
+    summary['healthy'], summary['problems'], summary['warnings'] = check_health(summary)
+    _atomic_write(path, json.dumps(summary, indent=2))
+    return summary
+
+
+def latency_limit(timeframe):
+    """p95 candle close -> delivery limit in seconds for a timeframe"""
+    return INTERVAL_MS.get(timeframe, 0) / 1000 + MAX_P95_TOTAL_SECONDS
+
+
+def check_health(summary, now=None):
+    """Decide from the bot's own run data whether it is healthy - returns (ok, problems, warnings).
+
+    Warnings are reported but do not make the run unhealthy: a few pairs
+    failing to fetch is normal, every pair failing is not. Likewise deferred
+    pairs are a warning until they are most of the due pairs or persist for
+    MAX_DEFERRED_RUNS runs.
+    """
+    now = now or time.time()
+    problems = []
+    warnings = []
+    if summary.get('error'):
+        problems.append(f"run failed: {summary['error'].strip().splitlines()[-1]}")
+    # With the scheduler on, a run is only expected to fetch the pairs it scheduled
+    total = summary.get('pairs_scheduled', summary.get('pairs_total', 0))
+    fetched = summary.get('pairs_fetched', 0)
+    if total and fetched == 0:
+        problems.append(f"0/{total} pairs fetched")
+    elif total and fetched < total:
+        warnings.append(f"only {fetched}/{total} pairs fetched")
+    deferred = summary.get('pairs_deferred', 0)
+    if deferred:
+        due = deferred + summary.get('pairs_scheduled', 0)
+        runs = summary.get('deferred_runs', 1)
+        message = f"{deferred}/{due} due pairs deferred by the run budget (run {runs} in a row)"
+        if deferred / due > MAX_DEFERRED_SHARE or runs >= MAX_DEFERRED_RUNS:
+            problems.append(message)
+        else:
+            warnings.append(message)
+    workers = summary.get('workers', 0)
+    if workers and summary.get('workers_reported', 0) < workers:
+        problems.append(f"only {summary.get('workers_reported', 0)}/{workers} workers reported")
+    finished = summary.get('finished_at', 0)
+    if now - finished > MAX_SUMMARY_AGE_SECONDS:
+        problems.append(f"last run finished {int((now - finished) / 60)}m ago")
+    for key, pct in summary.get('latency', {}).items():
+        if not key.startswith("signal_"):
+            continue
+        limit = latency_limit(key[len("signal_"):])
+        if pct.get('p95', 0) > limit:
+            problems.append(f"{key} p95 latency {pct['p95']:.1f}s > {limit:.0f}s")
+    return len(problems) == 0, problems, warnings
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.latency .cache/run_summary_3m.json
+    # Exits non-zero when the last run summary says the bot is unhealthy.
+    summary_path = sys.argv[1] if len(sys.argv) > 1 else ".cache/run_summary.json"
+    if not os.path.exists(summary_path):
+        print(f"❌ No run summary at {summary_path}")
+        sys.exit(1)
+    with open(summary_path, "r") as f:
+        summary = json.load(f)
+    ok, problems, warnings = check_health(summary)
+    for key, pct in summary.get('latency', {}).items():
+        print(f"⏱️ {key}: p50={pct['p50']:.1f}s p95={pct['p95']:.1f}s p99={pct['p99']:.1f}s")
+    for warning in warnings:
+        print(f"⚠️ {warning}")
+    if ok:
+        print("✅ Bot healthy")
+    else:
+        for problem in problems:
+            print(f"❌ {problem}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Columns kept per candle; close_time is stored as float64 (exact for ms timestamps)
+RING_FIELDS = ["open", "high", "low", "close", "volume", "close_time", "ATR"]
+
+
+class CandleRing:
+    """Fixed-capacity candle buffer for one (symbol, timeframe).
+
+    Rows live in a (2 * capacity, fields) array and every candle is written
+    twice, at slot and slot + capacity. The newest n rows are therefore always
+    one contiguous block, so windows are plain views - nothing is copied or
+    allocated however many candles have gone through the ring.
+    """
+
+    def __init__(self, capacity=200, fields=RING_FIELDS):
+        self.capacity = capacity
+        self.fields = list(fields)
+        self.values = np.full((2 * capacity, len(self.fields)), np.nan)
+        self.open_time = np.zeros(2 * capacity, dtype=np.int64)
+        self.count = 0           # Candles currently held (<= capacity)
+        self.head = 0            # Slot of the newest candle
+        self.last_open_time = -1
+        self.fetched_at = np.nan
+
+    def __len__(self):
+        return self.count
+
+    def push(self, open_time_ms, row):
+        """Add a candle, or overwrite the newest one when it has the same open_time
+        (the still-forming candle). Older candles are ignored."""
+        if open_time_ms < self.last_open_time:
+            return False
+        if open_time_ms > self.last_open_time:
+            if self.count:
+                self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.last_open_time = int(open_time_ms)
+        for slot in (self.head, self.head + self.capacity):
+            self.values[slot] = row
+            self.open_time[slot] = open_time_ms
+        return True
+
+    def extend(self, df):
+        """Push the rows of a fetched frame that are not older than the newest candle held"""
+        open_time = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        rows = np.column_stack([
+            np.asarray(df[name], dtype=float) if name in df else np.full(len(df), np.nan)
+            for name in self.fields
+        ])
+        for i in np.flatnonzero(open_time >= self.last_open_time):
+            self.push(open_time[i], rows[i])
+        self.fetched_at = df.attrs.get('fetched_at', self.fetched_at)
+
+    def window(self, n=None):
+        """(values, open_time) views of the newest n candles, oldest first"""
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity + 1
+        return self.values[end - n:end], self.open_time[end - n:end]
+
+    def columns(self, n=None):
+        """Column views of the newest n candles, keyed like a DataFrame"""
+        values, _ = self.window(n)
+        return {name: values[:, j] for j, name in enumerate(self.fields)}
+
+    def frame(self, n=None):
+        """DataFrame over the newest n candles. Its data block is a view into the ring,
+        so it is only valid until the next push - copy it to keep it."""
+        values, open_time = self.window(n)
+        df = pd.DataFrame(values, columns=self.fields, index=pd.to_datetime(open_time, unit="ms"), copy=False)
+        df.index.name = "open_time"
+        df.attrs['fetched_at'] = self.fetched_at
+        return df
+
+
+class MarketState:
+    """One CandleRing per (symbol, timeframe); memory is fixed by capacity and pair count"""
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.rings = {}
+
+    def __len__(self):
+        return len(self.rings)
+
+    def ring(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self.rings:
+            self.rings[key] = CandleRing(self.capacity)
+        return self.rings[key]
+
+    def ingest(self, data):
+        """Push fetched frames {(symbol, tf): df or None} into the rings and
+        return the same mapping with ring-backed frames (None stays None)"""
+        out = {}
+        for (symbol, tf), df in data.items():
+            if df is None or not len(df):
+                out[(symbol, tf)] = None
+                continue
+            ring = self.ring(symbol, tf)
+            ring.extend(df)
+            out[(symbol, tf)] = ring.frame()
+        return out
+
+    def frames(self):
+        return {key: ring.frame() for key, ring in self.rings.items() if len(ring)}
@@ -1,8 +1,13 @@
+import numpy as np
+import pandas as pd
 from ta.momentum import RSIIndicator, StochasticOscillator
 
 def calculate_momentum(df):
-    rsi = RSIIndicator(df['close'], window=14).rsi().iloc[-1]
-    stoch = StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-1]
+    close = pd.Series(np.asarray(df['close'], dtype=float), copy=False)
+    high = pd.Series(np.asarray(df['high'], dtype=float), copy=False)
+    low = pd.Series(np.asarray(df['low'], dtype=float), copy=False)
+    rsi = RSIIndicator(close, window=14).rsi().iloc[-1]
+    stoch = StochasticOscillator(high, low, close, window=14).stoch().iloc[-1]
     return int((rsi + stoch) / 2)
 
 def momentum_category(val):
@@ -11,4 +16,4 @@ def momentum_category(val):
     elif val < 60:
         return "MEDIUM"
     else:
-        return "HIGH"
\ No newline at end of file
+        return "HIGH"
@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import time
+import numpy as np
+from src.data import ATR_PERIOD, INTERVAL_MS, TF_MAP, fetch_klines, add_atr, closed_candles
+from src.indicators import ema
+
+logger = logging.getLogger(__name__)
+
+# Timeframes in a symbol's view, finest first; each one's trend/regime is read
+# by the timeframes below it
+MTF_TIMEFRAMES = ["3m", "5m", "15m", "1h"]
+HIGHER = {"3m": "15m", "5m": "15m", "15m": "1h"}
+MTF_LIMIT = 100  # Candles fetched for a timeframe the job does not scan itself
+TREND_FAST, TREND_SLOW = 9, 21
+# Volatility regime: ATR% percentile over the frame, below LOW -> 0, above HIGH -> 2, else 1
+REGIME_LOW, REGIME_HIGH = 0.2, 0.8
+
+
+class TimeframeState:
+    """Trend and volatility regime per closed bar of one timeframe.
+
+    trend is +1 (fast EMA above slow and close above slow), -1 (the mirror)
+    or 0; regime is 0/1/2 for LOW/NORMAL/HIGH ATR% against the frame's own
+    range. close_time is each bar's close in ms, so lower timeframes can find
+    the last higher bar that had closed at any moment.
+    """
+
+    def __init__(self, close_time, trend, regime):
+        self.close_time = np.asarray(close_time, dtype=np.int64)
+        self.trend = np.asarray(trend, dtype=np.int8)
+        self.regime = np.asarray(regime, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.close_time)
+
+    @classmethod
+    def from_frame(cls, df):
+        """State over the closed candles of a fetch_klines + add_atr frame"""
+        close = np.asarray(df['close'], dtype=float)
+        cols = {'close': close}
+        fast, slow = ema(cols, TREND_FAST), ema(cols, TREND_SLOW)
+        trend = np.where((fast > slow) & (close > slow), 1, np.where((fast < slow) & (close < slow), -1, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atr_pct = np.asarray(df['ATR'], dtype=float) / close
+        # Rank of each bar's ATR% among the frame's valid bars; ta's ATR is 0.0,
+        # not NaN, over its warm-up bars, which would skew the ranks upward
+        valid = ~np.isnan(atr_pct) & (atr_pct > 0)
+        valid[:ATR_PERIOD] = False
+        pct = np.full(len(close), np.nan)
+        if valid.any():
+            ordered = np.sort(atr_pct[valid])
+            pct[valid] = np.searchsorted(ordered, atr_pct[valid], side='right') / len(ordered)
+        regime = np.where(pct > REGIME_HIGH, 2, np.where(pct < REGIME_LOW, 0, 1))
+        return cls(np.asarray(df['close_time'], dtype=np.int64), trend, regime)
+
+    def index_at(self, time_ms):
+        """Index of the last bar closed by time_ms (array in, array out), -1 if none"""
+        return np.searchsorted(self.close_time, time_ms, side='right') - 1
+
+    def tail(self, n):
+        return TimeframeState(self.close_time[-n:], self.trend[-n:], self.regime[-n:])
+
+    def to_dict(self):
+        return {"close_time": self.close_time.tolist(), "trend": self.trend.tolist(), "regime": self.regime.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["close_time"], d["trend"], d["regime"])
+
+
+class MultiTimeframeView:
+    """One symbol's timeframes on a common time axis.
+
+    Built once per symbol per run; every timeframe job of the symbol reads the
+    same states. trend()/regime() are O(1) reads of the latest closed bar and
+    aligned() maps a lower timeframe's bars onto a higher one for history.
+    """
+
+    def __init__(self, symbol, states):
+        self.symbol = symbol
+        self.states = states  # tf -> TimeframeState
+
+    def _last(self, tf, field):
+        state = self.states.get(tf)
+        if state is None or not len(state):
+            return np.nan
+        return float(getattr(state, field)[-1])
+
+    def trend(self, tf):
+        return self._last(tf, 'trend')
+
+    def regime(self, tf):
+        return self._last(tf, 'regime')
+
+    def higher(self, tf):
+        """The timeframe whose trend and regime tf reads, if it is in the view"""
+        htf = HIGHER.get(tf)
+        return htf if htf in self.states else None
+
+    def features(self, tf):
+        """htf_trend / htf_regime for a pair on tf (NaN without a higher timeframe)"""
+        htf = self.higher(tf)
+        return {
+            'htf_trend': self.trend(htf) if htf else np.nan,
+            'htf_regime': self.regime(htf) if htf else np.nan,
+        }
+
+    def aligned(self, tf, close_time):
+        """(trend, regime) of tf as of each close_time (ms) of a lower timeframe, NaN before its first bar"""
+        state = self.states.get(tf)
+        close_time = np.asarray(close_time, dtype=np.int64)
+        if state is None or not len(state):
+            empty = np.full(len(close_time), np.nan)
+            return empty, empty.copy()
+        idx = state.index_at(close_time)
+        known = idx >= 0
+        trend = np.where(known, state.trend[np.maximum(idx, 0)], np.nan)
+        regime = np.where(known, state.regime[np.maximum(idx, 0)], np.nan)
+        return trend, regime
+
+
+class MultiTimeframeCache:
+    """Higher-timeframe TimeframeStates shared by the timeframe jobs, persisted as JSON.
+
+    A state stays valid until its timeframe's next candle closes, so a 3m job
+    refetches the 1h candles once an hour rather than every run. Every job
+    writes the higher timeframes it scans or fetches, and save() merges with
+    what other jobs wrote since the load, keeping the newer state per key -
+    the 15m job's state serves the 3m and 5m jobs that share the file.
+
+    In the GitHub workflows each timeframe restores its own cache artifact,
+    so there the file is shared only by runs of the same job and the 3m and
+    5m jobs still fetch 15m/1h once per candle close each. That is two small
+    requests per symbol per 15m close; pulling another workflow's artifact
+    on every run would cost more than it saves.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.states = {}
+        if os.path.exists(path) and os.path.getsize(path):
+            try:
+                with open(path, "r") as f:
+                    self.states = json.load(f)
+            except (json.JSONDecodeError, TypeError, ValueError):
+                self.states = {}
+
+    def get(self, symbol, tf, now_ms, stale=False):
+        """The cached state while it is current (or at all with stale=True)"""
+        entry = self.states.get(f"{symbol}|{tf}")
+        if not entry or not entry["close_time"]:
+            return None
+        if not stale and entry["close_time"][-1] + INTERVAL_MS[tf] < now_ms:
+            return None
+        return TimeframeState.from_dict(entry)
+
+    def put(self, symbol, tf, state):
+        self.states[f"{symbol}|{tf}"] = state.tail(MTF_LIMIT).to_dict()
+
+    def save(self):
+        states = dict(self.states)
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    on_disk = json.load(f)
+            except (json.JSONDecodeError, TypeError, ValueError):
+                on_disk = {}
+            for key, entry in on_disk.items():
+                ours = states.get(key)
+                if not ours or (entry["close_time"] and ours["close_time"]
+                                and entry["close_time"][-1] > ours["close_time"][-1]):
+                    states[key] = entry
+        tmp = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(states, f)
+        os.replace(tmp, self.path)
+        self.states = states
+
+
+def build_views(symbols, timeframes, data, cache=None, now=None, fetch_missing=True, on_fetch=None):
+    """MultiTimeframeView per symbol from the frames held {(symbol, tf): df}.
+
+    The view holds the scanned timeframes plus their higher timeframes.
+    Those without a current frame come from cache while their last candle is
+    current, otherwise from one small fetch per symbol and timeframe
+    (skipped with fetch_missing=False). on_fetch() is called before each
+    fetch and charges it to the run's budgets; when it returns False the
+    last cached state is used, however old. A scanned timeframe whose frame
+    is stale (the scheduler deferred the pair) keeps that frame and is never
+    refetched here. Higher timeframes built from a scanned frame are put in
+    the cache for the jobs that do not scan them.
+    """
+    now = now or time.time()
+    now_ms = now * 1000
+    wanted = set(timeframes) | {HIGHER[tf] for tf in timeframes if tf in HIGHER}
+    views = {}
+    for symbol in symbols:
+        states = {}
+        for tf in (tf for tf in MTF_TIMEFRAMES if tf in wanted):
+            df = closed_candles(data.get((symbol, tf)), now)
+            # A frame counts only while no newer candle of its timeframe has closed
+            if df is not None and len(df) and int(df['close_time'].iloc[-1]) + INTERVAL_MS[tf] >= now_ms:
+                states[tf] = TimeframeState.from_frame(df)
+                if cache is not None and tf in HIGHER.values():
+                    cache.put(symbol, tf, states[tf])
+                continue
+            if df is not None and len(df) and tf in timeframes:
+                states[tf] = TimeframeState.from_frame(df)
+                continue
+            state = cache.get(symbol, tf, now_ms) if cache is not None else None
+            if state is None and fetch_missing and on_fetch is not None and not on_fetch():
+                state = cache.get(symbol, tf, now_ms, stale=True) if cache is not None else None
+                if state is None:
+                    continue
+            if state is None and fetch_missing:
+                fetched = fetch_klines(symbol, TF_MAP[tf], limit=MTF_LIMIT)
+                if fetched is None:
+                    logger.warning(f"No {tf} candles for the {symbol} timeframe view")
+                    continue
+                state = TimeframeState.from_frame(closed_candles(add_atr(fetched), now))
+                if cache is not None:
+                    cache.put(symbol, tf, state)
+            if state is not None:
+                states[tf] = state
+        views[symbol] = MultiTimeframeView(symbol, states)
+    return views
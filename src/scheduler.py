@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import numpy as np
+from src.data import INTERVAL_MS
+
+# A pair at these levels scores 1.0 on that input; each input is capped at 2.0.
+# Validation rejects SL distances under 0.05% and the tightest SL is 0.7x ATR
+# (the VWAP strategies), so a pair needs ATR% around 0.1 before its signals pass.
+ACTIVE_ATR_PCT = 0.1
+ACTIVE_RANGE_PCT = 0.5   # High-low range of the last RANGE_BARS candles, % of price
+RANGE_BARS = 20
+# Activity score -> evaluate every n-th candle; below the last tier every MAX_SKIP-th
+SKIP_TIERS = [(1.0, 1), (0.5, 2)]
+MAX_SKIP = 4
+KLINES_WEIGHT = 2  # Binance request weight of one klines call
+PAIR_SECONDS_ALPHA = 0.3
+
+
+def activity_score(df):
+    """Mean of ATR%, recent range % and volume ratio, each against its 'active' level"""
+    close = np.asarray(df['close'], dtype=float)
+    last = close[-1]
+    atr_pct = float(np.asarray(df['ATR'], dtype=float)[-1]) / last * 100
+    high = np.asarray(df['high'], dtype=float)[-RANGE_BARS:]
+    low = np.asarray(df['low'], dtype=float)[-RANGE_BARS:]
+    range_pct = (high.max() - low.min()) / last * 100
+    volume = np.asarray(df['volume'], dtype=float)
+    vol_mean = volume[-10:].mean()
+    vol_ratio = volume[-1] / vol_mean if vol_mean else 0.0
+    parts = [atr_pct / ACTIVE_ATR_PCT, range_pct / ACTIVE_RANGE_PCT, vol_ratio]
+    return float(np.mean([min(p, 2.0) if not math.isnan(p) else 0.0 for p in parts]))
+
+
+def candles_between_evals(score):
+    for threshold, skip in SKIP_TIERS:
+        if score >= threshold:
+            return skip
+    return MAX_SKIP
+
+
+class EvalScheduler:
+    """Decides which (symbol, timeframe) pairs a run fetches and evaluates.
+
+    Every evaluated pair gets an activity score and a next_due time: active
+    pairs are due at every candle close, quiet ones every 2nd or 4th. A run
+    takes the due pairs - open trades first, then the most overdue and most
+    active - up to its request-weight budget and the number of pairs the
+    time budget allows at the measured cost per pair. Pairs left over stay
+    due and rank higher next run. State persists as JSON between runs.
+    """
+
+    def __init__(self, path, time_budget, weight_budget):
+        self.path = path
+        self.time_budget = time_budget
+        self.weight_budget = weight_budget
+        self.pairs = {}
+        self.pair_seconds = np.nan
+        if os.path.exists(path) and os.path.getsize(path):
+            try:
+                with open(path, "r") as f:
+                    raw = json.load(f)
+                self.pairs = raw.get("pairs", {})
+                self.pair_seconds = raw.get("pair_seconds") or np.nan
+            except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+                self.pairs = {}
+
+    def capacity(self):
+        """Pairs one run can afford"""
+        cap = self.weight_budget // KLINES_WEIGHT
+        if not math.isnan(self.pair_seconds) and self.pair_seconds > 0:
+            cap = min(cap, int(self.time_budget / self.pair_seconds))
+        return max(int(cap), 1)
+
+    def spare_fetches(self, planned):
+        """Klines requests left in the weight budget once planned pairs are fetched"""
+        return max(self.weight_budget // KLINES_WEIGHT - planned, 0)
+
+    def plan(self, pairs, now, open_pairs=()):
+        """(pairs to fetch this run in priority order, number of due pairs deferred)"""
+        open_pairs = set(open_pairs)
+        due = []
+        for symbol, tf in pairs:
+            entry = self.pairs.get(f"{symbol}|{tf}", {})
+            overdue = (now - entry.get("next_due", 0)) / (INTERVAL_MS[tf] / 1000)
+            has_trade = (symbol, tf) in open_pairs
+            if has_trade or overdue >= 0:
+                due.append((not has_trade, -(overdue + entry.get("score", 0.0)), symbol, tf))
+        due.sort(key=lambda d: d[:2])
+        cap = self.capacity()
+        return [(symbol, tf) for _, _, symbol, tf in due[:cap]], max(len(due) - cap, 0)
+
+    def observe(self, symbol, tf, df):
+        """Score a freshly fetched pair from its closed candles and set when it is next due"""
+        if df is None or len(df) < RANGE_BARS:
+            return
+        score = activity_score(df)
+        interval = INTERVAL_MS[tf] / 1000
+        closed_until = (float(np.asarray(df['close_time'])[-1]) + 1) / 1000
+        self.pairs[f"{symbol}|{tf}"] = {
+            "score": round(score, 4),
+            "next_due": closed_until + candles_between_evals(score) * interval,
+        }
+
+    def record(self, pairs, seconds):
+        """Feed the run's fetch + evaluate time so the time budget tracks the real cost per pair"""
+        if not pairs:
+            return
+        sample = seconds / pairs
+        if math.isnan(self.pair_seconds):
+            self.pair_seconds = sample
+        else:
+            self.pair_seconds += PAIR_SECONDS_ALPHA * (sample - self.pair_seconds)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "pair_seconds": None if math.isnan(self.pair_seconds) else self.pair_seconds,
+                "pairs": self.pairs,
+            }, f)
+        os.replace(tmp, self.path)
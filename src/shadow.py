@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+from src.cache import TradeCache, StrategyHistory
+from src.strategy_compiler import compile_strategies, load_strategies
+
+# Shadow variants: a JSON file shaped like STRATEGY_LIST. Variants run on the
+# live data pass and share its indicator values; their would-be signals and
+# exits go to a separate trade cache and outcome history, never to Telegram.
+SHADOW_STRATEGIES_FILE = os.getenv("SHADOW_STRATEGIES_FILE")
+MAX_SHADOW_TRADES = 200
+
+
+def load_shadow_plan(path=SHADOW_STRATEGIES_FILE):
+    """Compiled plan for the shadow variants, or None when shadow mode is off"""
+    if not path or not os.path.exists(path):
+        return None
+    specs = load_strategies(path)
+    return compile_strategies(specs) if specs else None
+
+
+class ShadowBook:
+    """Open hypothetical trades plus per-variant outcomes (a StrategyHistory)"""
+
+    def __init__(self, cache_dir=".cache", suffix=""):
+        self.trades = TradeCache(os.path.join(cache_dir, f"shadow_trades{suffix}.json"))
+        self.trades.max_active_trades = MAX_SHADOW_TRADES
+        self.history = StrategyHistory(os.path.join(cache_dir, f"shadow_history{suffix}.json"))
+
+    def open_keys(self):
+        return {(t['symbol'], t['timeframe'], t['strategy'], t['side']) for t in self.trades.get_all()}
+
+    def open(self, table, rows):
+        """Record the given CandidateTable rows as open shadow trades; returns how many"""
+        now = int(time.time() * 1000)
+        for n, i in enumerate(rows):
+            self.trades.add(table.to_signal(i, f"S{now}-{n}"))
+        return len(rows)
+
+
+def shadow_report(shadow_history, live_history=None):
+    """Per-variant stats rows over every retained tier: trades, winrate and mean profit %,
+    with the live strategies alongside"""
+    rows = []
+    for source, history in (("shadow", shadow_history), ("live", live_history)):
+        if history is None:
+            continue
+        for strategy in history.strategies():
+            stats = history.stats(strategy)
+            rows.append({
+                "source": source,
+                "strategy": strategy,
+                "trades": stats["trades"],
+                "winrate": stats["wins"] / stats["trades"],
+                "avg_profit_pct": stats["profit_pct"] / stats["trades"],
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.shadow [suffix]   e.g. python -m src.shadow _3m
+    suffix = sys.argv[1] if len(sys.argv) > 1 else ""
+    shadow = StrategyHistory(f".cache/shadow_history{suffix}.json")
+    live = StrategyHistory(f".cache/strategy_history{suffix}.json")
+    print(f"{'source':<7} {'strategy':<40} {'trades':>6} {'winrate':>8} {'avg %':>8}")
+    for row in shadow_report(shadow, live):
+        print(f"{row['source']:<7} {row['strategy']:<40} {row['trades']:>6} {row['winrate']:>8.1%} {row['avg_profit_pct']:>8.3f}")
@@ -0,0 +1,195 @@
+import json
+import operator
+import numpy as np
+from src.indicators import INDICATORS
+
+# Strategies are plain data:
+#   {"name": ..., "side": "LONG"|"SHORT", "atr_mult": {...},
+#    "when": [[lhs, op, rhs], ...]}   # all conditions must hold
+# where lhs/rhs are indicator references like ["rsi", 14], ["close", 1]
+# (previous close), ["htf_trend"] (higher-timeframe trend, +1/0/-1) or
+# plain numbers.
+
+OPS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+# a < b is the same comparison as b > a - canonicalised so mirror pairs share it
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def _ref(term):
+    """Normalise an indicator reference (list from JSON or tuple) into a hashable key"""
+    if isinstance(term, (int, float)):
+        return float(term)
+    name, *params = term
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}")
+    return (name, *params)
+
+
+def _condition_key(cond):
+    lhs, op, rhs = cond
+    if op not in OPS:
+        raise ValueError(f"Unknown operator: {op}")
+    lhs, rhs = _ref(lhs), _ref(rhs)
+    # Constants always on the right, and a stable order for two indicators
+    if isinstance(lhs, float) or (not isinstance(rhs, float) and repr(rhs) < repr(lhs)):
+        lhs, rhs, op = rhs, lhs, FLIPPED[op]
+    return (lhs, op, rhs)
+
+
+class StrategyPlan:
+    """Compiled evaluation plan for a set of declarative strategies.
+
+    Every distinct indicator and comparison appears once, no matter how many
+    strategies reference it. Conditions inside a strategy are ordered by
+    cost / (1 - pass rate) so cheap, selective checks short-circuit the
+    expensive ones. Pass rates are counted on every evaluation but only
+    change the order when reorder() is called - once per run - so the order
+    is fixed while a run is in progress.
+    """
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.indicators = {}
+        self.conditions = []
+        cond_index = {}
+        self.strategies = []
+
+        for spec in self.specs:
+            cond_ids = []
+            for cond in spec["when"]:
+                key = _condition_key(cond)
+                if key not in cond_index:
+                    cond_index[key] = len(self.conditions)
+                    self.conditions.append(key)
+                    for term in (key[0], key[2]):
+                        if not isinstance(term, float):
+                            self.indicators.setdefault(term, INDICATORS[term[0]])
+                cond_ids.append(cond_index[key])
+            self.strategies.append({
+                "strategy": spec["name"],
+                "side": spec["side"],
+                "atr_mult": spec["atr_mult"],
+                "conditions": list(dict.fromkeys(cond_ids)),
+            })
+
+        n = len(self.conditions)
+        self.cost = np.array([self._term_cost(c[0]) + self._term_cost(c[2]) for c in self.conditions], dtype=float)
+        self.evaluated = np.zeros(n)
+        self.passed = np.zeros(n)
+        self.reorder()
+
+    def _term_cost(self, term):
+        return 0 if isinstance(term, float) else self.indicators[term]["cost"]
+
+    def reorder(self):
+        """Re-rank every strategy's conditions from the pass rates counted so far"""
+        # Laplace-smoothed pass rate, so unseen conditions start at 0.5
+        pass_rate = (self.passed + 1) / (self.evaluated + 2)
+        rank = self.cost / np.maximum(1 - pass_rate, 1e-3)
+        for strat in self.strategies:
+            strat["order"] = sorted(strat["conditions"], key=lambda c: rank[c])
+
+    def describe(self):
+        """Human-readable summary of what the plan shares"""
+        refs = sum(len(s["when"]) for s in self.specs)
+        return (f"{len(self.specs)} strategies, {refs} condition refs -> "
+                f"{len(self.conditions)} comparisons over {len(self.indicators)} indicators")
+
+    # -- last bar -------------------------------------------------------
+
+    def _last_value(self, cols, term, values):
+        if isinstance(term, float):
+            return term
+        if term not in values:
+            ind = self.indicators[term]
+            params = term[1:]
+            if "last" in ind:
+                values[term] = ind["last"](cols, *params)
+            else:
+                values[term] = ind["full"](cols, *params)[-1]
+        return values[term]
+
+    def evaluate_last(self, cols, values=None):
+        """Evaluate every strategy on the latest bar.
+
+        Returns a list of {"strategy", "side", "atr_mult"} in definition order,
+        the same shape run_all_strategies always returned. values caches
+        indicator results by reference; pass the same dict to several plans
+        evaluated on the same bars and each indicator is computed once.
+        """
+        values = {} if values is None else values
+        results = {}
+        triggered = []
+        for strat in self.strategies:
+            ok = True
+            for c in strat["order"]:
+                if c not in results:
+                    lhs, op, rhs = self.conditions[c]
+                    try:
+                        results[c] = bool(OPS[op](self._last_value(cols, lhs, values), self._last_value(cols, rhs, values)))
+                    except Exception:
+                        results[c] = False
+                    self.evaluated[c] += 1
+                    self.passed[c] += results[c]
+                if not results[c]:
+                    ok = False
+                    break
+            if ok:
+                triggered.append({
+                    "strategy": strat["strategy"],
+                    "side": strat["side"],
+                    "atr_mult": strat["atr_mult"],
+                })
+        return triggered
+
+    # -- full history ---------------------------------------------------
+
+    def evaluate_history(self, cols, arrays=None):
+        """Evaluate every strategy on every bar.
+
+        Returns a boolean matrix of shape (bars, strategies); column j matches
+        self.strategies[j]. Indicators are computed at most once and only if a
+        strategy still has live bars when its condition is reached. arrays
+        pre-seeds per-bar values by reference, e.g. {("htf_trend",): ...}.
+        """
+        n_bars = len(cols['close'])
+        arrays = {} if arrays is None else dict(arrays)
+        results = {}
+
+        def term_array(term):
+            if isinstance(term, float):
+                return term
+            if term not in arrays:
+                arrays[term] = np.asarray(self.indicators[term]["full"](cols, *term[1:]), dtype=float)
+            return arrays[term]
+
+        out = np.zeros((n_bars, len(self.strategies)), dtype=bool)
+        for j, strat in enumerate(self.strategies):
+            mask = np.ones(n_bars, dtype=bool)
+            for c in strat["order"]:
+                if not mask.any():
+                    break
+                if c not in results:
+                    lhs, op, rhs = self.conditions[c]
+                    with np.errstate(invalid='ignore'):
+                        results[c] = OPS[op](term_array(lhs), term_array(rhs))
+                    self.evaluated[c] += n_bars
+                    self.passed[c] += results[c].sum()
+                mask &= results[c]
+            out[:, j] = mask
+        return out
+
+
+def compile_strategies(specs):
+    return StrategyPlan(specs)
+
+
+def load_strategies(path):
+    """Load strategy definitions from a JSON file (same shape as STRATEGY_LIST)"""
+    with open(path, "r") as f:
+        return json.load(f)
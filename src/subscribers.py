@@ -0,0 +1,73 @@
+import bisect
+import itertools
+import json
+import os
+
+ANY = "*"
+
+
+class SubscriberRegistry:
+    """Per-chat signal subscriptions with a precomputed routing index.
+
+    Subscriptions are loaded from a JSON list such as:
+        [{"chat_id": "-100123", "symbols": ["BTCUSDT"], "timeframes": ["3m", "5m"],
+          "strategies": null, "sides": ["LONG"], "min_confidence": 0.65}]
+    Missing or null filters match everything; a single string such as
+    "symbols": "BTCUSDT" is read as a one-item list.
+
+    Each subscription is filed under every (symbol, timeframe, side, strategy)
+    key it accepts, with "*" for unfiltered fields. A signal only looks up the
+    16 keys that could match it, and each bucket is sorted by min_confidence
+    so a bisect finds the chats whose threshold the signal clears.
+    """
+
+    def __init__(self, path=None, subscriptions=None):
+        self.path = path
+        if subscriptions is None:
+            subscriptions = []
+            if path and os.path.exists(path):
+                with open(path, "r") as f:
+                    subscriptions = json.load(f)
+        self.subscriptions = [s for s in subscriptions if s.get("chat_id") is not None]
+        self._build_index()
+
+    def _build_index(self):
+        buckets = {}
+        for sub in self.subscriptions:
+            fields = [_values(sub.get(name)) for name in ("symbols", "timeframes", "sides", "strategies")]
+            threshold = float(sub.get("min_confidence") or 0)
+            for key in itertools.product(*fields):
+                buckets.setdefault(key, []).append((threshold, str(sub["chat_id"])))
+        self.index = {}
+        for key, entries in buckets.items():
+            entries.sort(key=lambda e: e[0])
+            self.index[key] = ([e[0] for e in entries], [e[1] for e in entries])
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def match(self, signal):
+        """Chat ids subscribed to this signal, in a stable order without duplicates"""
+        if not self.index:
+            return []
+        confidence = signal.get('confidence', 0)
+        chats = {}
+        for key in itertools.product(
+            (signal['symbol'], ANY), (signal['timeframe'], ANY), (signal['side'], ANY), (signal['strategy'], ANY)
+        ):
+            bucket = self.index.get(key)
+            if bucket is None:
+                continue
+            thresholds, chat_ids = bucket
+            for chat_id in chat_ids[:bisect.bisect_right(thresholds, confidence)]:
+                chats[chat_id] = None
+        return list(chats)
+
+
+def _values(value):
+    """A subscription filter as a list of accepted values ([ANY] when unfiltered)"""
+    if not value:
+        return [ANY]
+    if isinstance(value, str):
+        return [value]
+    return list(value)
@@ -1,14 +1,37 @@
 import asyncio
 import time
 from telegram import Bot
+from telegram.error import RetryAfter
+
+# Telegram allows roughly 30 messages/second across chats for broadcasts
+BROADCAST_RATE = 25
+BROADCAST_CONCURRENCY = 20
 
 def emoji(side):
     return "🟢" if side == "LONG" else "🔴"
 
+class RateLimiter:
+    """Spaces sends evenly at `rate` per second across concurrent tasks"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
 class TelegramBot:
-    def __init__(self, token, chat_id):
+    def __init__(self, token, chat_id, subscribers=None):
         self.bot = Bot(token)
         self.chat_id = chat_id
+        self.subscribers = subscribers
+        self._limiter = None
 
     async def test_connection(self):
         """Test Telegram bot connection"""
@@ -25,7 +48,17 @@ class TelegramBot:
         except Exception as e:
             raise Exception(f"Telegram connection failed: {e}")
 
+    def recipients(self, event):
+        """Main chat plus every subscriber whose filters match the signal/trade"""
+        chats = [str(self.chat_id)] if self.chat_id else []
+        if self.subscribers:
+            chats += [c for c in self.subscribers.match(event) if c not in chats]
+        return chats
+
     async def send_signal(self, signal):
+        await self.broadcast(self.format_signal(signal), self.recipients(signal))
+
+    def format_signal(self, signal):
         # Calculate risk/reward ratios
         entry = signal['entry']
         sl = signal['sl']
@@ -81,8 +114,7 @@ class TelegramBot:
             f"📊 Data: {signal.get('candle_count', 200)} candles\n"
             f"🚀 STRATEGY: {signal['strategy']}"
         )
-        
-        await self._send(msg)
+        return msg
 
     async def send_trade_close(self, trade, exit_info):
         profit = exit_info['exit_price'] - trade['entry'] if trade['side'] == 'LONG' else trade['entry'] - exit_info['exit_price']
@@ -97,7 +129,7 @@ class TelegramBot:
             f"📋 Reason: {exit_info['reason']}\n"
             f"🔢 SLNO: <b>{trade['slno']}</b>"
         )
-        await self._send(msg)
+        await self.broadcast(msg, self.recipients(trade))
 
     async def send_error(self, err):
         msg = f"⚠️ Bot Error:\n<pre>{err}</pre>"
@@ -118,16 +150,39 @@ class TelegramBot:
                 )
         await self._send(msg)
 
-    async def _send(self, msg, retry=2):
+    async def broadcast(self, msg, chat_ids):
+        """Deliver one rendered message to many chats concurrently within Telegram's rate limit"""
+        if len(chat_ids) <= 1:
+            for chat_id in chat_ids:
+                await self._send(msg, chat_id=chat_id)
+            return
+        if self._limiter is None:
+            self._limiter = RateLimiter(BROADCAST_RATE)
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+        async def deliver(chat_id):
+            async with semaphore:
+                await self._limiter.wait()
+                await self._send(msg, chat_id=chat_id)
+
+        await asyncio.gather(*(deliver(c) for c in chat_ids))
+
+    async def _send(self, msg, retry=2, chat_id=None):
         for i in range(retry):
             try:
                 await self.bot.send_message(
-                    chat_id=self.chat_id,
+                    chat_id=chat_id or self.chat_id,
                     text=msg,
                     parse_mode="HTML",
                     disable_web_page_preview=True
                 )
                 break
+            except RetryAfter as e:
+                # Flood control: wait exactly as long as Telegram asks
+                if i == retry - 1:
+                    print(f"Telegram send failed: {e}")
+                    break
+                await asyncio.sleep(e.retry_after)
             except Exception as e:
                 if i == retry - 1:
                     print(f"Telegram send failed: {e}")
@@ -1,3 +1,5 @@
+import numpy as np
+
 def is_valid_signal(signal, confidence_threshold):
     """Validate signals for scalping with strict criteria"""
     # Check for empty or missing TP array
@@ -35,4 +37,46 @@ def is_valid_signal(signal, confidence_threshold):
         elif side == 'SHORT' and tp >= entry:
             return False  # TP must be below entry for SHORT
         
-    return True
\ No newline at end of file
+    return True
+
+def validation_checks(table, confidence_threshold):
+    """Vectorized is_valid_signal checks over a CandidateTable, in order - [(reason, passed_mask)]"""
+    entry, sl, tp, side_long = table.entry, table.sl, table.tp, table.side_long
+    tp_set = ~np.isnan(tp)
+    checks = [
+        ("no_atr", table.built),
+        ("no_tp", tp_set.any(axis=1)),
+        ("confidence", table.confidence >= confidence_threshold),
+        # NaN momentum (not enough candles) never passes
+        ("momentum", (table.momentum >= 15) & (table.momentum <= 90)),
+    ]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 0.05% to 5% SL distance for crypto scalping
+        sl_pct = np.abs(entry - sl) / entry * 100
+        checks.append(("sl_distance", (sl_pct >= 0.05) & (sl_pct <= 5.0)))
+
+        # 0.03% to 3% first TP for crypto scalping
+        tp_pct = np.abs(tp[:, 0] - entry) / entry * 100
+        checks.append(("tp_distance", (tp_pct >= 0.03) & (tp_pct <= 3.0)))
+
+    # All TPs must be on the profit side of entry
+    above = tp > entry[:, None]
+    below = tp < entry[:, None]
+    right_side = np.where(side_long[:, None], above, below) | ~tp_set
+    checks.append(("tp_direction", right_side.all(axis=1)))
+    return checks
+
+def valid_mask(table, confidence_threshold):
+    """Vectorized is_valid_signal over a CandidateTable - returns a boolean mask"""
+    mask = np.ones(table.size, dtype=bool)
+    for _, passed in validation_checks(table, confidence_threshold):
+        mask &= passed
+    return mask
+
+def rejection_reasons(table, confidence_threshold):
+    """First failed validation check per row ("" when the row is valid)"""
+    reasons = np.full(table.size, "", dtype=object)
+    for reason, passed in validation_checks(table, confidence_threshold):
+        reasons[(reasons == "") & ~passed] = reason
+    return reasons
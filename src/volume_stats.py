@@ -0,0 +1,238 @@
+import bisect
+import json
+import math
+import os
+from collections import deque
+import numpy as np
+
+# Relative accuracy of sketch quantiles (1% of the true value)
+SKETCH_ACCURACY = 0.01
+SKETCH_MAX_BINS = 2048
+# Quantile window in candles: 2880 = 6 days of 3m, 10 days of 5m, 30 days of 15m
+QUANTILE_WINDOW = 2880
+# Percentile tiers need this many candles before they replace the mean ratio
+MIN_QUANTILE_SAMPLES = 500
+
+
+class VolumeSketch:
+    """Log-bucketed quantile sketch (DDSketch style) with bounded memory.
+
+    Values land in bucket ceil(log_gamma(v)), so any quantile is returned to
+    within SKETCH_ACCURACY relative error. Once there are more than max_bins
+    buckets the lowest ones are folded together - that only costs accuracy
+    at the very bottom of the distribution, never at the spike end.
+
+    Bucket indexes are also kept in a sorted list, so an insert never sorts;
+    quantile() and rank() binary-search a cumulative-count array that is
+    built on the first read after an insert and reused until the next one.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.accuracy = accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.keys = []  # sorted bins indexes
+        self.zeros = 0
+        self.count = 0
+        self._cdf = None  # (indexes, cumulative counts) as of the last insert
+
+    def _set_bins(self, bins):
+        self.bins = bins
+        self.keys = sorted(bins)
+        self._cdf = None
+
+    def _cumulative(self):
+        if self._cdf is None:
+            keys = np.asarray(self.keys, dtype=np.int64)
+            counts = np.asarray([self.bins[k] for k in self.keys], dtype=np.int64)
+            self._cdf = (keys, np.cumsum(counts))
+        return self._cdf
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = self._index(value)
+        self._cdf = None
+        if index in self.bins:
+            self.bins[index] += 1
+            return
+        self.bins[index] = 1
+        bisect.insort(self.keys, index)
+        if len(self.keys) > self.max_bins:
+            lowest = self.keys.pop(0)
+            self.bins[self.keys[0]] += self.bins.pop(lowest)
+
+    def merged(self, other):
+        """New sketch holding both sketches' samples"""
+        out = VolumeSketch(self.accuracy, self.max_bins)
+        bins = dict(self.bins)
+        for index, n in other.bins.items():
+            bins[index] = bins.get(index, 0) + n
+        out._set_bins(bins)
+        out.zeros = self.zeros + other.zeros
+        out.count = self.count + other.count
+        return out
+
+    def quantile(self, q):
+        if not self.count:
+            return np.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        keys, cum = self._cumulative()
+        i = int(np.searchsorted(cum, rank - seen, side='right'))
+        return self._value(int(keys[min(i, len(keys) - 1)]))
+
+    def rank(self, value):
+        """Fraction of samples at or below value"""
+        if not self.count:
+            return np.nan
+        if value <= 0:
+            return self.zeros / self.count
+        keys, cum = self._cumulative()
+        i = int(np.searchsorted(keys, self._index(value), side='right'))
+        below = self.zeros + (int(cum[i - 1]) if i else 0)
+        return below / self.count
+
+    def to_dict(self):
+        return {"bins": {str(k): v for k, v in self.bins.items()}, "zeros": self.zeros, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, d, accuracy=SKETCH_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        sketch = cls(accuracy, max_bins)
+        sketch._set_bins({int(k): v for k, v in d.get("bins", {}).items()})
+        sketch.zeros = d.get("zeros", 0)
+        sketch.count = d.get("count", 0)
+        return sketch
+
+
+class VolumeStats:
+    """Streaming volume statistics for one symbol/timeframe.
+
+    Per closed candle: O(1) rolling mean over `window` bars, O(1) EWMA, and an
+    O(1) sketch insert. Quantiles cover the last quantile_window to
+    2 * quantile_window candles using two rotating sketches, so old regimes
+    age out without keeping any candles around.
+    """
+
+    def __init__(self, window=10, span=20, quantile_window=QUANTILE_WINDOW):
+        self.window = window
+        self.alpha = 2 / (span + 1)
+        self.quantile_window = quantile_window
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0.0
+        self.ewma = np.nan
+        self.last = np.nan
+        self.last_open_time = -1
+        self.current = VolumeSketch()
+        self.previous = VolumeSketch()
+        self._window = None  # current + previous merged, until the next update
+
+    def update(self, volume, open_time_ms):
+        """Feed one closed candle; candles at or before the last one seen are ignored"""
+        if open_time_ms <= self.last_open_time:
+            return False
+        volume = float(volume)
+        if len(self.recent) == self.window:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(volume)
+        self.recent_sum += volume
+        self.ewma = volume if math.isnan(self.ewma) else self.ewma + self.alpha * (volume - self.ewma)
+        self.last = volume
+        self.last_open_time = int(open_time_ms)
+        self._window = None
+        if self.current.count >= self.quantile_window:
+            self.previous, self.current = self.current, VolumeSketch()
+        self.current.add(volume)
+        return True
+
+    @property
+    def samples(self):
+        return self.current.count + self.previous.count
+
+    def mean(self):
+        return self.recent_sum / self.window if len(self.recent) == self.window else np.nan
+
+    def ratio(self):
+        """Latest volume over the rolling mean"""
+        mean = self.mean()
+        return self.last / mean if mean else np.nan
+
+    def quantile(self, q):
+        if self._window is None:
+            self._window = self.current.merged(self.previous)
+        return self._window.quantile(q)
+
+    def percentile(self, volume=None):
+        """Where volume (default: the latest candle) sits in the long-window distribution, 0..1"""
+        if self.samples < MIN_QUANTILE_SAMPLES:
+            return np.nan
+        volume = self.last if volume is None else volume
+        # An empty sketch ranks NaN, so only the non-empty ones are weighted in
+        sketches = [sketch for sketch in (self.current, self.previous) if sketch.count]
+        return sum(sketch.rank(volume) * sketch.count for sketch in sketches) / self.samples
+
+    def to_dict(self):
+        return {
+            "recent": list(self.recent),
+            "ewma": None if math.isnan(self.ewma) else self.ewma,
+            "last_open_time": self.last_open_time,
+            "current": self.current.to_dict(),
+            "previous": self.previous.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d, **kwargs):
+        stats = cls(**kwargs)
+        stats.recent.extend(d.get("recent", [])[-stats.window:])
+        stats.recent_sum = float(sum(stats.recent))
+        stats.last = stats.recent[-1] if stats.recent else np.nan
+        stats.ewma = np.nan if d.get("ewma") is None else d["ewma"]
+        stats.last_open_time = d.get("last_open_time", -1)
+        stats.current = VolumeSketch.from_dict(d.get("current", {}))
+        stats.previous = VolumeSketch.from_dict(d.get("previous", {}))
+        return stats
+
+
+class VolumeStatsStore:
+    """VolumeStats for every symbol/timeframe, persisted between runs as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = {}
+        if os.path.exists(path) and os.path.getsize(path):
+            try:
+                with open(path, "r") as f:
+                    raw = json.load(f)
+                self.stats = {key: VolumeStats.from_dict(d) for key, d in raw.items()}
+            except (json.JSONDecodeError, TypeError, ValueError):
+                self.stats = {}
+
+    def get(self, symbol, timeframe):
+        return self.stats.get(f"{symbol}|{timeframe}")
+
+    def update(self, symbol, timeframe, df):
+        """Feed the closed candles in df that are newer than the last one seen"""
+        stats = self.stats.setdefault(f"{symbol}|{timeframe}", VolumeStats())
+        open_time = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        volume = np.asarray(df['volume'], dtype=float)
+        for i in np.flatnonzero(open_time > stats.last_open_time):
+            stats.update(volume[i], open_time[i])
+        return stats
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({key: stats.to_dict() for key, stats in self.stats.items()}, f)
+        os.replace(tmp, self.path)